@@ -4,7 +4,7 @@ import ErrorBoundary from './ErrorBoundary.tsx';
 import ExportModal from './ExportModal.tsx';
 import DecklistRow from './DecklistRow.tsx';
 import './App.css';
-import { deserializeDecklist, deleteDecklist, getDecklists, parseFormattedDecklist } from './StorageManager';
+import { deserializeDecklist, loadCardDatabase, deleteDecklist, getDecklists, parseFormattedDecklist } from './StorageManager';
 import { useLiveQuery } from "dexie-react-hooks";
 import { motion } from "motion/react"
 import { MdCameraAlt, MdOutlineArrowBack } from 'react-icons/md';
@@ -161,8 +161,7 @@ function App() {
   const [deckNameForModal, setDeckNameForModal] = useState('');
 
   useEffect(() => {
-    fetch("/card_database.json").then(r => r.json())
-      .then(setCardDatabase);
+    loadCardDatabase().then(setCardDatabase);
   }, [setCardDatabase]);
 
   const [hasStarted, setHasStarted] = useState(false);
@@ -1,39 +1,73 @@
-import { useEffect, useState } from 'react';
+import { useLayoutEffect, useRef, useState } from 'react';
+
+// image_variants is {format: [widths]}, with files named like the ones written by fetch_data.py
+function getCardImageSrcSet(id, format, widths) {
+  return widths.map(width => `/cards/${id}-${width}w.${format} ${width}w`).join(', ');
+}
 
 function CardImageForID({ id, showSetInfo = false, cardDatabase, onLoaded }) {
   const imageUrl = `/cards/${id}.png`;
   const card = cardDatabase != null ? cardDatabase[id] : {};
+  const imageVariants = card?.image_variants || {};
   const [hasLoaded, setHasLoaded] = useState(false);
-  useEffect(() => {
-    async function waitForLoad() {
-      if (!hasLoaded) {
-        await fetch(imageUrl); // wait for this network request to finish
-        setHasLoaded(true);
-        if (onLoaded) {
-          setTimeout(() => {
-            onLoaded(id);
-          }, 500);
-        }
+  // Card images are drawn at very different widths depending on where they are, so the width is measured
+  // from the card back shown while loading and passed as sizes - without it the browser assumes 100vw and
+  // always picks the widest variant. The picture is only added once it's known, so nothing is fetched early
+  const placeholderRef = useRef(null);
+  const [renderedWidth, setRenderedWidth] = useState(null);
+
+  useLayoutEffect(() => {
+    if (renderedWidth == null && placeholderRef.current != null) {
+      setRenderedWidth(placeholderRef.current.getBoundingClientRect().width);
+    }
+  }, [renderedWidth]);
+
+  function onImageLoaded() {
+    if (!hasLoaded) {
+      setHasLoaded(true);
+      if (onLoaded) {
+        setTimeout(() => {
+          onLoaded(id);
+        }, 500);
       }
     }
-    waitForLoad();
-  }, [hasLoaded, setHasLoaded,]);
+  }
 
-  return hasLoaded ?
-    <div className='card-image-container'>
+  // The image stays hidden behind the card back until it has loaded, so only the variant
+  // the browser picks is downloaded
+  return <>
+    <div className='card-image-container' style={hasLoaded ? {} : { display: 'none' }}>
       {
         showSetInfo ? <div className="card-set-info-text">
           {card.set_code}&nbsp;
           {card.number}
         </div> : null
       }
-      <img src={imageUrl} style={{ width: '100%' }} />
+      {
+        renderedWidth == null ? null : <picture>
+          {
+            Object.entries(imageVariants).map(([format, widths]) =>
+              <source
+                key={format}
+                type={`image/${format}`}
+                srcSet={getCardImageSrcSet(id, format, widths)}
+                // Not measurable while hidden (e.g. in a closed tab), in which case any variant could be needed
+                sizes={renderedWidth > 0 ? `${Math.ceil(renderedWidth)}px` : '100vw'}
+              />
+            )
+          }
+          <img src={imageUrl} onLoad={onImageLoaded} onError={onImageLoaded} style={{ width: '100%' }} />
+        </picture>
+      }
     </div>
-    :
-    <div className="card-image-loading-spinner-container">
-      <img src='/cardback.jpg' style={{ width: '100%' }}></img>
-      <span className="card-image-loading-spinner"></span>
-    </div>;
+    {
+      hasLoaded ? null :
+        <div className="card-image-loading-spinner-container" ref={placeholderRef}>
+          <img src='/cardback.jpg' style={{ width: '100%' }}></img>
+          <span className="card-image-loading-spinner"></span>
+        </div>
+    }
+  </>;
 }
 
 export default CardImageForID;
@@ -1,6 +1,30 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { TYPE_TO_ENERGY_SYMBOL_URL, getPokemonSpriteUrlForCard } from './ExportModal';
 
+// Trainer and special energy symbols are packed into one atlas per directory by fetch_data.py (see
+// write_symbol_atlas in data_fetcher/fetcher/images.py), so a list of cards loads two images rather than one per card.
+// Each index is {width, height, symbols: {fileName: [x, y, width, height]}}
+const SYMBOL_ATLAS_DIRECTORIES = ['trainer-symbols', 'special-energy-symbols'];
+// Matches .card-preview-icon in index.css
+const ICON_HEIGHT = 24;
+
+type SymbolAtlas = {
+    width: number;
+    height: number;
+    symbols: Record<string, [number, number, number, number]>;
+};
+
+let symbolAtlasesPromise: Promise<Record<string, SymbolAtlas | null>> | null = null;
+
+function loadSymbolAtlases() {
+    if (symbolAtlasesPromise == null) {
+        symbolAtlasesPromise = Promise.all(SYMBOL_ATLAS_DIRECTORIES.map(
+            directory => fetch(directory + '-atlas.json').then(r => r.json()).catch(() => null)
+        )).then(indexes => Object.fromEntries(SYMBOL_ATLAS_DIRECTORIES.map((directory, i) => [directory, indexes[i]])));
+    }
+    return symbolAtlasesPromise;
+}
+
 function sanitizeForFilename(name: string) {
     return name.replaceAll(' ', '-').toLowerCase().replaceAll(/(\'|\.|:|\(|\))/g, '').replace('♀', 'f').replace('♂', 'm');
 }
@@ -8,6 +32,12 @@ function sanitizeForFilename(name: string) {
 
 
 export default function CardPreviewIcon({ cardInfo }: { cardInfo: any }) {
+    const [symbolAtlases, setSymbolAtlases] = useState<Record<string, SymbolAtlas | null> | null>(null);
+
+    useEffect(() => {
+        loadSymbolAtlases().then(setSymbolAtlases);
+    }, []);
+
     if (!cardInfo) return null;
     const { supertype, name } = cardInfo;
 
@@ -26,5 +56,27 @@ export default function CardPreviewIcon({ cardInfo }: { cardInfo: any }) {
 
     if (!src) return null;
 
+    // Symbols in an atlas are drawn from it, scaled to the icon height. Anything else (or everything, if
+    // the atlases haven't loaded) uses its own file
+    const [directory, fileName] = src.split('/');
+    const atlas = symbolAtlases?.[directory];
+    const position = atlas?.symbols[fileName];
+    if (position != null) {
+        const [x, y, width, height] = position;
+        const scale = ICON_HEIGHT / height;
+        return <span
+            className="card-preview-icon"
+            role="img"
+            aria-label="icon"
+            style={{
+                display: 'inline-block',
+                width: width * scale,
+                backgroundImage: `url(${directory}-atlas.png)`,
+                backgroundSize: `${atlas.width * scale}px ${atlas.height * scale}px`,
+                backgroundPosition: `${-x * scale}px ${-y * scale}px`,
+            }}
+        />;
+    }
+
     return <img className="card-preview-icon" src={src} alt="icon" />;
 }
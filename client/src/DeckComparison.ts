@@ -6,7 +6,14 @@ export type DeckComparisonCard = CardInfo & {
     count: number;
 };
 
-function getCardComparisonKey(card: CardInfo, fallbackIndex?: number) {
+function getCardComparisonKey(card: CardInfo, cardDatabase: CardDatabase, fallbackIndex?: number) {
+    // Precomputed by fetch_data.py with the same grouping as below. Looked up by id rather than read
+    // from the card itself, since saved decklists can predate the field
+    const equivalenceClassId = cardDatabase?.[card.id ?? '']?.equivalence_class_id;
+    if (equivalenceClassId != null) {
+        return `class:${equivalenceClassId}`;
+    }
+
     if (card.cardMechanicsHash != null) {
         return `mechanics:${card.cardMechanicsHash}`;
     }
@@ -44,7 +51,7 @@ export function buildMinRarityDecklist(decklist: CardInfo[], cardDatabase: CardD
     }>();
 
     decklist.forEach((card, index) => {
-        const groupKey = getCardComparisonKey(card, index);
+        const groupKey = getCardComparisonKey(card, cardDatabase, index);
         const existingGroup = groupedCards.get(groupKey);
         if (!existingGroup) {
             groupedCards.set(groupKey, {
@@ -107,7 +114,7 @@ export function buildDeckVennSections(deckA: CardInfo[], deckB: CardInfo[], card
 
     const addCardsToGroup = (deck: CardInfo[], countField: 'deckACount' | 'deckBCount') => {
         deck.forEach((card, index) => {
-            const comparisonKey = getCardComparisonKey(card, index);
+            const comparisonKey = getCardComparisonKey(card, cardDatabase, index);
             const existingGroup = groupsByKey.get(comparisonKey);
 
             if (!existingGroup) {
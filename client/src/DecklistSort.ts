@@ -9,6 +9,12 @@ export type CardInfo = {
     number?: string;
     evolves_from?: string | null;
     cardMechanicsHash?: string;
+    // Changes whenever the way cardMechanicsHash is computed changes
+    cardMechanicsHashVersion?: number;
+    // Cards with the same id here are interchangeable in a deck
+    equivalence_class_id?: number;
+    // {format: [widths]} of the smaller image variants available for this card
+    image_variants?: Record<string, number[]>;
     rarity_order?: number;
 };
 
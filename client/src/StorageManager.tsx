@@ -66,6 +66,87 @@ const INCLUDED_SINGLE_PRIZE_ATTACKER_CANDIDATE_REFERENCE_IDS = [
     'me5-68', // Toucannon
 ];
 
+const CARD_DATABASE_URL = '/card_database.json';
+// Written by fetch_data.py: {latest, patches: {fromVersion: patchPath}}
+const CARD_DATABASE_VERSIONS_URL = '/card_database_versions.json';
+
+function applyCardDatabasePatch(cardDatabase: CardDatabase, patch) {
+    // See get_card_database_patch in data_fetcher/fetcher/export.py for the patch format
+    const removedIDs = new Set(patch.removed);
+    const addedCards = {};
+    let ids = patch.order;
+    if (ids == null) {
+        ids = Object.keys(cardDatabase).filter(id => !removedIDs.has(id));
+        patch.added.forEach(([position, id]) => ids.splice(position, 0, id));
+    }
+    patch.added.forEach(([, id, card]) => {
+        addedCards[id] = card;
+    });
+
+    const result = {};
+    ids.forEach(id => {
+        if (addedCards[id] != null) {
+            result[id] = addedCards[id];
+            return;
+        }
+        const card = { ...cardDatabase[id], ...patch.changed[id]?.set };
+        (patch.changed[id]?.unset ?? []).forEach(field => delete card[field]);
+        result[id] = card;
+    });
+    return result;
+}
+
+async function getCardDatabaseVersion(text: string) {
+    // Same as get_card_database_version in data_fetcher/fetcher/export.py: the start of the file's SHA-256
+    if (crypto.subtle == null) {
+        return null;
+    }
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('').slice(0, 16);
+}
+
+async function loadCardDatabase(): Promise<CardDatabase> {
+    // Returning visitors only download the patches since the version they have stored, if there are any
+    const versions = await fetch(CARD_DATABASE_VERSIONS_URL, { cache: 'no-cache' })
+        .then(r => r.json())
+        .catch(() => null);
+    const stored = await db.cardDatabase.get('current').catch(() => null);
+
+    if (versions != null && stored != null) {
+        let cards = stored.cards;
+        let version = stored.version;
+        try {
+            while (version !== versions.latest && versions.patches[version] != null) {
+                const patch = await fetch('/' + versions.patches[version]).then(r => r.json());
+                cards = applyCardDatabasePatch(cards, patch);
+                version = patch.to;
+            }
+        } catch (error) {
+            console.error('Could not apply card database patches', error);
+        }
+        if (version === versions.latest) {
+            if (version !== stored.version) {
+                await db.cardDatabase.put({ key: 'current', version, cards });
+            }
+            return cards;
+        }
+    }
+
+    if (versions == null && stored != null) {
+        // Offline, or the manifest couldn't be read - the stored database is better than nothing
+        return stored.cards;
+    }
+
+    // The database could have been rebuilt since the manifest was fetched, so it's only stored under the
+    // latest version if its hash matches that version
+    const text = await fetch(CARD_DATABASE_URL, { cache: 'no-cache' }).then(r => r.text());
+    const cards = JSON.parse(text);
+    if (versions != null && await getCardDatabaseVersion(text) === versions.latest) {
+        await db.cardDatabase.put({ key: 'current', version: versions.latest, cards });
+    }
+    return cards;
+}
+
 function getCardMechanicsHashSet(cardDatabase: CardDatabase, exampleIDs: string[]) {
     return new Set(exampleIDs.map(id => cardDatabase[id]?.cardMechanicsHash).filter(hash => hash != null));
 }
@@ -301,4 +382,4 @@ function parseFormattedDecklist(formattedDecklist, cardDatabase) {
     return dedupedRows;
 }
 
-export { seralizeDecklist, deserializeDecklist, formatDeckTimestamp, deleteDecklist, addDecklistToDB, getDecklists, getLatestPlayer, overWriteLatestPlayer, parseFormattedDecklist, getAutoCoverPokemonName };
+export { loadCardDatabase, seralizeDecklist, deserializeDecklist, formatDeckTimestamp, deleteDecklist, addDecklistToDB, getDecklists, getLatestPlayer, overWriteLatestPlayer, parseFormattedDecklist, getAutoCoverPokemonName };
@@ -6,4 +6,7 @@ export const db = new Dexie('myDatabase');
 db.version(1).stores({
     decklists: '++createdTimestamp, successorCreatedTimestamp', // Primary key is the created timestamp
     players: '++playerName, lastUsedTimestamp', // Primary key is the player name
-});
\ No newline at end of file
+});
+db.version(2).stores({
+    cardDatabase: 'key', // A single 'current' entry of {key, version, cards}, kept up to date with patches
+});
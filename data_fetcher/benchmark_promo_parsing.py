@@ -0,0 +1,47 @@
+import contextlib
+import time
+
+from check_promo_parsing import FIXTURE_SPECIES_NUMBERS, get_fixture_pages, searching_whole_page
+from fetcher import promos
+from fetcher.promos import parse_promo_card_page
+
+# Measures how quickly promo card pages are parsed, matching each field pattern only where its anchor text appears,
+# against searching the whole page for every field as the parser used to. Uses the hand-written pages in
+# fixtures/promo_pages - real pkmncards.com pages are around 70KB, mostly navigation and related cards around
+# the card itself, so they're padded to that size. Species numbers come from the fixtures, so nothing is downloaded
+
+RUNS = 5
+PAGES_PER_RUN = 1000
+PAGE_SIZE = 70_000
+PADDING = '<li class="related"><a href="https://pkmncards.com/card/related/">Related card</a></li>\n'
+
+
+def get_padded_page(card_html):
+    body_position = card_html.rindex('</body>')
+    padding = PADDING * ((PAGE_SIZE - len(card_html)) // len(PADDING) + 1)
+    return card_html[:body_position] + padding + card_html[body_position:]
+
+
+if __name__ == '__main__':
+    promos.promo_species_number_cache = dict(FIXTURE_SPECIES_NUMBERS)
+    promos.promo_species_number_cache_seeded = True
+
+    for card_id, card_html in get_fixture_pages().items():
+        set_id = card_id.split('-')[0]
+        padded_html = get_padded_page(card_html)
+        pages_per_second = {}
+        for parser_name, parsing in [('anchored', contextlib.nullcontext), ('whole page', searching_whole_page)]:
+            run_seconds = []
+            with parsing():
+                for run in range(RUNS):
+                    start_time = time.perf_counter()
+                    for _ in range(PAGES_PER_RUN):
+                        parse_promo_card_page(padded_html, set_id)
+                    run_seconds.append(time.perf_counter() - start_time)
+            pages_per_second[parser_name] = PAGES_PER_RUN / min(run_seconds)
+
+        print(
+            f"{card_id} ({len(padded_html) // 1000}KB): best of {RUNS}: "
+            + ', '.join(f"{parser_name} {rate:.0f} pages/s" for parser_name, rate in pages_per_second.items())
+            + f" ({pages_per_second['anchored'] / pages_per_second['whole page']:.1f}x)"
+        )
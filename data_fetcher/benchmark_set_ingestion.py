@@ -0,0 +1,22 @@
+import time
+
+from fetcher.cards import download_sets_with_cards, get_sets_cards_df
+
+# Measures how quickly card records are built from the set JSON of every Scarlet & Violet and Mega Evolution set.
+# Downloads aren't timed - run with FETCH_DATA_HTTP_MODE=replay to benchmark from a recording without the network
+
+RUNS = 5
+
+if __name__ == '__main__':
+    sets_with_cards = download_sets_with_cards()
+    total_cards = sum(len(cards_in_set) for set_data, cards_in_set in sets_with_cards)
+
+    run_seconds = []
+    for run in range(RUNS):
+        start_time = time.perf_counter()
+        get_sets_cards_df(sets_with_cards)
+        run_seconds.append(time.perf_counter() - start_time)
+
+    best_seconds = min(run_seconds)
+    print(f"Built {total_cards} cards from {len(sets_with_cards)} sets")
+    print(f"Best of {RUNS}: {best_seconds:.3f}s ({total_cards / best_seconds:.0f} cards/s)")
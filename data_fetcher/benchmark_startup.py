@@ -0,0 +1,61 @@
+import importlib
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Measures how long it takes to import each fetcher module in a fresh interpreter, which is what a test run,
+# benchmark or spawned worker process pays before doing anything, and checks imports don't write any files
+
+RUNS = 5
+MODULES = [
+    'fetcher.config',
+    'fetcher.names',
+    'fetcher.mechanics',
+    'fetcher.network',
+    'fetcher.promos',
+    'fetcher.image_variants',
+    'fetcher.cards',
+    'fetcher.images',
+    'fetcher.export',
+    'fetcher.scheduler',
+    'fetcher.build',
+    'fetcher.cli',
+]
+
+
+def get_import_seconds(module, cwd):
+    # Best of RUNS, timed inside the interpreter so interpreter startup itself isn't counted
+    code = f"import time; start_time = time.perf_counter(); import {module}; print(time.perf_counter() - start_time)"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    return min(
+        float(subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True, text=True, check=True).stdout)
+        for _ in range(RUNS)
+    )
+
+
+def import_module_in_worker(module):
+    importlib.import_module(module)
+    return module
+
+
+def get_worker_startup_seconds(module):
+    # Time until a freshly spawned worker has imported the module and returned a result
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        executor.submit(import_module_in_worker, module).result()
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as cwd:
+        for module in MODULES:
+            print(f"import {module}: {get_import_seconds(module, cwd) * 1000:.1f}ms")
+        print(f"Files written by importing every module: {sorted(os.listdir(cwd))}")
+
+    for module in ['fetcher.image_variants', 'fetcher.cards']:
+        seconds = min(get_worker_startup_seconds(module) for _ in range(RUNS))
+        print(f"Spawned worker importing {module}: {seconds * 1000:.1f}ms")
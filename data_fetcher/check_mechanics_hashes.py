@@ -0,0 +1,70 @@
+from unittest import mock
+
+from check_promo_parsing import FIXTURE_SPECIES_NUMBERS, FIXTURES_DIRECTORY
+from fetcher import mechanics, promos
+from fetcher.cards import get_sets_cards_df
+from fetcher.mechanics import MECHANICS_HASH_VERSION, get_card_mechanics_encoding, get_card_mechanics_hashes
+from fetcher.promos import parse_promo_card_page
+
+# Checks that a promo parsed from its pkmncards.com page and the same card from the set JSON get the same
+# mechanics hash, since clients use it to swap printings, and that every encoding starts with the version byte.
+# Uses the hand-written page in fixtures/promo_pages, so this runs without the network
+
+PROMO_CARD_ID = 'svp-106'
+
+# The same card as PokemonTCG/pokemon-tcg-data has it, printed in a set rather than as a promo
+SET_DATA = {"id": "sv3pt5", "name": "151", "ptcgoCode": "MEW", "printedTotal": 165}
+SET_JSON_CARD = {
+    "id": "sv3pt5-999",
+    "name": "Pikachu ex",
+    "supertype": "Pokémon",
+    "subtypes": ["Basic", "ex", "Tera"],
+    "hp": "200",
+    "types": ["Lightning"],
+    "abilities": [{"name": "Resolute Heart", "text": "If this Pokémon has full HP...", "type": "Ability"}],
+    "attacks": [
+        {"name": "Topaz Bolt", "cost": ["Lightning", "Lightning"], "convertedEnergyCost": 2, "damage": "300", "text": ""},
+        {"name": "Other & Attack", "cost": [], "convertedEnergyCost": 0, "damage": "", "text": ""},
+    ],
+    "weaknesses": [{"type": "Fighting", "value": "×2"}],
+    "resistances": [{"type": "Metal", "value": "-30"}],
+    "retreatCost": ["Colorless"],
+    "convertedRetreatCost": 1,
+    "number": "999",
+    "rarity": "Special Illustration Rare",
+    "nationalPokedexNumbers": [25],
+    "regulationMark": "G",
+    "images": {"small": "https://images.pokemontcg.io/sv3pt5/999.png"},
+}
+
+
+if __name__ == '__main__':
+    promos.promo_species_number_cache = dict(FIXTURE_SPECIES_NUMBERS)
+    promos.promo_species_number_cache_seeded = True
+
+    with open(FIXTURES_DIRECTORY + '/' + PROMO_CARD_ID + '.html', encoding='utf-8') as f:
+        promo_card = parse_promo_card_page(f.read(), PROMO_CARD_ID.split('-')[0])
+    set_card_hash = get_sets_cards_df([(SET_DATA, [SET_JSON_CARD])])['cardMechanicsHash'][0]
+    # Promos that only have their attacks as concatenated names take the other branch of the encoding
+    concatenated_names_card = dict(promo_card, attacks=[])
+
+    promo_hash, set_json_hash, concatenated_names_hash = get_card_mechanics_hashes([promo_card, SET_JSON_CARD, concatenated_names_card])
+    assert promo_hash == promo_card['cardMechanicsHash'] == set_json_hash == set_card_hash == concatenated_names_hash, \
+        (promo_hash, promo_card['cardMechanicsHash'], set_json_hash, set_card_hash, concatenated_names_hash)
+    print(f"{PROMO_CARD_ID} and its set JSON twin both hash to {promo_hash}")
+
+    # Anything that changes how the card plays has to change the hash
+    for changes in [{"hp": "190"}, {"retreatCost": []}, {"weaknesses": []}, {"regulationMark": "H"}]:
+        changed_hash, = get_card_mechanics_hashes([dict(SET_JSON_CARD, **changes)])
+        assert changed_hash != set_json_hash, changes
+
+    # Encodings start with the version, so bumping it changes every hash
+    for card in [promo_card, SET_JSON_CARD]:
+        assert get_card_mechanics_encoding(card)[0] == MECHANICS_HASH_VERSION
+    with mock.patch.object(mechanics, 'MECHANICS_HASH_VERSION', MECHANICS_HASH_VERSION + 1):
+        next_version_encoding = get_card_mechanics_encoding(SET_JSON_CARD)
+        next_version_hash, = get_card_mechanics_hashes([SET_JSON_CARD])
+    assert next_version_encoding[0] == MECHANICS_HASH_VERSION + 1
+    assert next_version_encoding[1:] == get_card_mechanics_encoding(SET_JSON_CARD)[1:]
+    assert next_version_hash != set_json_hash
+    print(f"Encodings start with version byte {MECHANICS_HASH_VERSION}, and the next version changes the hash")
@@ -0,0 +1,99 @@
+import contextlib
+import json
+import os
+import random
+from unittest import mock
+
+from fetcher import promos
+from fetcher.promos import parse_promo_card_page, search_first_regex_match
+
+# Checks promo page parsing against the pages in fixtures/promo_pages: each page has to parse to the card
+# saved next to it, and randomly mutated copies of the pages have to parse the same as they would if every field
+# pattern searched the whole page, instead of only being matched where its anchor text appears.
+# The pages are hand-written in pkmncards.com's card page markup rather than downloaded, so they only cover
+# the parts of the layout the parser reads. Species numbers come from the fixtures, so this runs without the network
+
+FIXTURES_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) + '/fixtures/promo_pages'
+FIXTURE_SPECIES_NUMBERS = {"pikachu": [25]}
+MUTATED_PAGES_PER_FIXTURE = 5000
+SEED = 0
+
+
+def get_fixture_pages():
+    # {card id: page html} for every fixture page
+    return {
+        file_name[:-len('.html')]: open(FIXTURES_DIRECTORY + '/' + file_name, encoding='utf-8').read()
+        for file_name in sorted(os.listdir(FIXTURES_DIRECTORY)) if file_name.endswith('.html')
+    }
+
+
+def search_whole_page(pattern, text, anchor, default=None, endpos=None):
+    # What match_first_at_anchors stands in for. endpos is ignored, since no match can end past it
+    return search_first_regex_match(pattern, text, default=default)
+
+
+def find_all_in_whole_page(pattern, text, anchor):
+    return pattern.findall(text)
+
+
+def parse_or_error(card_html, set_id):
+    try:
+        return parse_promo_card_page(card_html, set_id)
+    except Exception as error:
+        return type(error).__name__
+
+
+def searching_whole_page():
+    # Parses the way promo pages were parsed before anchors, with every field pattern searching the whole page
+    patches = contextlib.ExitStack()
+    patches.enter_context(mock.patch.object(promos, 'match_first_at_anchors', search_whole_page))
+    patches.enter_context(mock.patch.object(promos, 'match_all_at_anchors', find_all_in_whole_page))
+    return patches
+
+
+def parse_by_searching_whole_page(card_html, set_id):
+    with searching_whole_page():
+        return parse_or_error(card_html, set_id)
+
+
+def mutate_page(card_html, rng):
+    # Deletes, duplicates, swaps or truncates a few tags
+    chunks = card_html.split('<')
+    for _ in range(rng.randint(1, 6)):
+        operation = rng.random()
+        index = rng.randrange(1, len(chunks))
+        if operation < 0.3:
+            del chunks[index]
+        elif operation < 0.6:
+            chunks.insert(rng.randrange(1, len(chunks)), chunks[index])
+        elif operation < 0.8:
+            other_index = rng.randrange(1, len(chunks))
+            chunks[index], chunks[other_index] = chunks[other_index], chunks[index]
+        else:
+            chunks[index] = chunks[index][:rng.randrange(len(chunks[index]) + 1)]
+    return '<'.join(chunks)
+
+
+if __name__ == '__main__':
+    promos.promo_species_number_cache = dict(FIXTURE_SPECIES_NUMBERS)
+    promos.promo_species_number_cache_seeded = True
+
+    for card_id, card_html in get_fixture_pages().items():
+        set_id = card_id.split('-')[0]
+        with open(FIXTURES_DIRECTORY + '/' + card_id + '.json', encoding='utf-8') as f:
+            expected_card = json.load(f)
+        assert parse_promo_card_page(card_html, set_id) == expected_card, f"{card_id} doesn't parse to {card_id}.json"
+        assert parse_by_searching_whole_page(card_html, set_id) == expected_card
+
+        rng = random.Random(SEED)
+        parsed_count = 0
+        for _ in range(MUTATED_PAGES_PER_FIXTURE):
+            mutated_html = mutate_page(card_html, rng)
+            card = parse_or_error(mutated_html, set_id)
+            expected = parse_by_searching_whole_page(mutated_html, set_id)
+            assert card == expected, f"Mutated {card_id} parses differently:\n{mutated_html}"
+            parsed_count += isinstance(card, dict)
+        print(
+            f"{card_id}: matches its saved card, and {MUTATED_PAGES_PER_FIXTURE} mutated copies ({parsed_count} parseable) "
+            f"match searching the whole page"
+        )
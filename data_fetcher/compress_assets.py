@@ -0,0 +1,241 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shlex
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Post-build step for the built client (after 'npm run build'): writes brotli and gzip versions of text assets
+# next to them, losslessly recompresses PNGs in place, and writes a manifest of every asset's content hash and
+# encodings. Results are cached by the hash of each input file, so unchanged files are skipped on later runs.
+# The manifest is what '--upload-commands' reads to upload each asset with the right Content-Encoding
+
+BUILD_DIRECTORY = './../client/dist'
+CACHE_DIRECTORY = './data/compressed_assets_cache'
+MANIFEST_FILE_NAME = 'asset-manifest.json'
+
+TEXT_CONTENT_TYPES = {
+    '.json': 'application/json',
+    '.js': 'text/javascript',
+    '.css': 'text/css',
+    '.html': 'text/html',
+    '.svg': 'image/svg+xml',
+    '.txt': 'text/plain',
+    '.map': 'application/json',
+}
+# Small files aren't worth the extra request header, and compressed files have to be meaningfully smaller
+MIN_COMPRESSIBLE_SIZE = 1024
+MAX_COMPRESSED_RATIO = 0.9
+# Bump this whenever the way files are compressed changes, so cached results aren't reused
+CACHE_VERSION = 1
+
+
+def write_file_atomically(path, data):
+    # Workers run in parallel, and identical assets share cache files, so each process writes its own
+    # temporary file and renames it into place - nothing is ever left truncated, even after a crash
+    part_path = f"{path}.{os.getpid()}.part"
+    with open(part_path, 'wb') as f:
+        f.write(data)
+    os.replace(part_path, path)
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def get_content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def compress_text(data):
+    # Returns {encoding: compressed bytes}, only for encodings that are worth serving
+    encodings = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(data, quality=11)
+    return {
+        encoding: compressed for encoding, compressed in encodings.items()
+        if len(compressed) <= len(data) * MAX_COMPRESSED_RATIO
+    }
+
+
+def get_palette_image(img):
+    # The image as a palette image with exactly the same pixels, or None if it has too many colors.
+    # Quantizing to as many colors as the image has is usually exact, and is checked to make sure
+    rgba = img.convert('RGBA')
+    colors = rgba.getcolors(256)
+    if colors is None:
+        return None
+    palette_image = rgba.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE)
+    if palette_image.convert('RGBA').tobytes() != rgba.tobytes():
+        return None
+    return palette_image
+
+
+def recompress_png(data):
+    # Returns the smallest lossless re-encoding of the PNG, or the original if nothing is smaller.
+    # Some downloaded '.png' files are really JPEGs, and are left alone
+    with Image.open(io.BytesIO(data)) as img:
+        if img.format != 'PNG':
+            return data
+        img.load()
+        candidates = [img] if img.mode in ['1', 'L', 'LA', 'P', 'RGB', 'RGBA'] else []
+        palette_image = get_palette_image(img) if img.mode != 'P' else None
+        if palette_image is not None:
+            candidates.append(palette_image)
+        best = data
+        for candidate in candidates:
+            output = io.BytesIO()
+            candidate.save(output, format='PNG', optimize=True)
+            if len(output.getvalue()) < len(best):
+                best = output.getvalue()
+        return best
+
+
+def process_asset(build_directory, relative_path, cache_directory):
+    # Returns the manifest entry for the asset, writing any recompressed or precompressed files
+    path = build_directory + '/' + relative_path
+    with open(path, 'rb') as f:
+        data = f.read()
+    extension = os.path.splitext(relative_path)[1].lower()
+    cache_prefix = cache_directory + '/' + get_content_hash(bytes([CACHE_VERSION]) + data)
+    cached = os.path.isfile(cache_prefix + '.json')
+
+    if cached:
+        with open(cache_prefix + '.json') as f:
+            result = json.load(f)
+    else:
+        result = {"recompressed": False, "encodings": []}
+        if extension == '.png':
+            recompressed = recompress_png(data)
+            if len(recompressed) < len(data):
+                result["recompressed"] = True
+                write_file_atomically(cache_prefix + '.png', recompressed)
+        elif extension in TEXT_CONTENT_TYPES and len(data) >= MIN_COMPRESSIBLE_SIZE:
+            for encoding, compressed in compress_text(data).items():
+                result["encodings"].append(encoding)
+                write_file_atomically(cache_prefix + '.' + encoding, compressed)
+        # Written last, so an interrupted run never leaves a result without its files
+        write_file_atomically(cache_prefix + '.json', json.dumps(result).encode('utf-8'))
+
+    original_size = len(data)
+    if result["recompressed"]:
+        data = read_file(cache_prefix + '.png')
+        write_file_atomically(path, data)
+    entry = {
+        "hash": get_content_hash(data),
+        "size": len(data),
+        "original_size": original_size,
+        "cached": cached,
+        "encodings": {},
+    }
+    for encoding in result["encodings"]:
+        encoded_path = path + ('.br' if encoding == 'br' else '.gz')
+        encoded_data = read_file(cache_prefix + '.' + encoding)
+        write_file_atomically(encoded_path, encoded_data)
+        entry["encodings"][encoding] = {
+            "path": relative_path + ('.br' if encoding == 'br' else '.gz'),
+            "content_encoding": encoding,
+            "size": len(encoded_data),
+        }
+    if extension in TEXT_CONTENT_TYPES:
+        entry["content_type"] = TEXT_CONTENT_TYPES[extension]
+    elif extension == '.png':
+        entry["content_type"] = 'image/png'
+    return relative_path, entry
+
+
+def get_asset_paths(build_directory):
+    # Paths relative to the build directory, leaving out outputs of earlier runs
+    asset_paths = []
+    for directory, _, file_names in os.walk(build_directory):
+        for file_name in file_names:
+            relative_path = os.path.relpath(directory + '/' + file_name, build_directory).replace(os.sep, '/')
+            if relative_path == MANIFEST_FILE_NAME or file_name.endswith('.br') or file_name.endswith('.gz') \
+                    or file_name.endswith('.part'):
+                continue
+            asset_paths.append(relative_path)
+    return sorted(asset_paths)
+
+
+def compress_assets(build_directory=BUILD_DIRECTORY, cache_directory=CACHE_DIRECTORY, workers=None):
+    if not os.path.exists(cache_directory):
+        os.makedirs(cache_directory)
+    if brotli is None:
+        print("brotli isn't installed, so only gzip versions will be written")
+    start_time = time.perf_counter()
+    asset_paths = get_asset_paths(build_directory)
+    count = len(asset_paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        manifest = dict(executor.map(
+            process_asset, [build_directory] * count, asset_paths, [cache_directory] * count, chunksize=16
+        ))
+
+    write_file_atomically(
+        build_directory + '/' + MANIFEST_FILE_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+    )
+
+    entries = list(manifest.values())
+    png_entries = [entry for entry in entries if entry.get('content_type') == 'image/png']
+    print(
+        f"Processed {len(manifest)} assets in {time.perf_counter() - start_time:.1f}s "
+        f"({sum(entry['cached'] for entry in entries)} from cache)"
+    )
+    print(
+        f"PNGs: {sum(entry['original_size'] for entry in png_entries) / 1_000_000:.2f} MB -> "
+        f"{sum(entry['size'] for entry in png_entries) / 1_000_000:.2f} MB"
+    )
+    for encoding in ['br', 'gzip']:
+        encoded_entries = [entry for entry in entries if encoding in entry['encodings']]
+        print(
+            f"{encoding}: {len(encoded_entries)} files, {sum(entry['size'] for entry in encoded_entries) / 1_000_000:.2f} MB -> "
+            f"{sum(entry['encodings'][encoding]['size'] for entry in encoded_entries) / 1_000_000:.2f} MB"
+        )
+    return manifest
+
+
+def get_upload_commands(build_directory, bucket_url):
+    # S3 serves a single object per key and can't pick an encoding from Accept-Encoding, so the gzip version
+    # (which every browser accepts) replaces the original under its key, with Content-Encoding and Content-Type
+    # set to match. Everything else is synced as it is. Brotli versions are for servers that can negotiate
+    # (like nginx with brotli_static), and aren't uploaded
+    with open(build_directory + '/' + MANIFEST_FILE_NAME) as f:
+        manifest = json.load(f)
+    bucket_url = bucket_url.rstrip('/')
+    commands = [
+        f"aws s3 sync {shlex.quote(build_directory)} {shlex.quote(bucket_url)} "
+        f"--exclude '*.br' --exclude '*.gz' --exclude '*.part' --exclude {shlex.quote(MANIFEST_FILE_NAME)}"
+    ]
+    for relative_path, entry in sorted(manifest.items()):
+        if 'gzip' not in entry['encodings']:
+            continue
+        commands.append(
+            f"aws s3 cp {shlex.quote(build_directory + '/' + entry['encodings']['gzip']['path'])} "
+            f"{shlex.quote(bucket_url + '/' + relative_path)} "
+            f"--content-encoding gzip --content-type {shlex.quote(entry['content_type'])}"
+        )
+    return commands
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompress and recompress the built client assets')
+    parser.add_argument('--build-directory', default=BUILD_DIRECTORY)
+    parser.add_argument('--cache-directory', default=CACHE_DIRECTORY)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--upload-commands', metavar='BUCKET_URL', default=None,
+                        help='Instead of compressing, print the aws commands that upload the compressed build (e.g. s3://bucket)')
+    args = parser.parse_args()
+    if args.upload_commands is not None:
+        print('\n'.join(get_upload_commands(args.build_directory, args.upload_commands)))
+    else:
+        compress_assets(args.build_directory, args.cache_directory, args.workers)
@@ -0,0 +1,5 @@
+# The card data build, as modules that can be imported on their own. Only cards, export, images and
+# image_variants import pandas, numpy or Pillow, so parsing and normalization (names, mechanics, promos, network)
+# can be reused cheaply, e.g. from benchmarks or worker processes. Importing anything here never touches the
+# filesystem - output paths come from config.configure, and directories are created when a build runs.
+# The build itself is a graph of stages in build.py, run by scheduler.py from cli.py, which fetch_data.py runs
@@ -0,0 +1,244 @@
+import json
+import os
+import time
+
+from fetcher import config
+from fetcher.cards import (
+    add_detection_keywords_to_df,
+    add_equivalence_class_ids_to_df,
+    add_similar_card_ids_to_df,
+    build_stats,
+    build_stats_lock,
+    download_sets_with_cards,
+    drop_export_only_columns,
+    get_cards_df,
+)
+from fetcher.export import write_card_database, write_card_database_patches, write_card_store
+from fetcher.image_variants import get_card_image_variant_paths, write_card_image_variants_for_ids
+from fetcher.images import (
+    download_missing_card_images_for_df,
+    download_missing_sprites_for_df,
+    write_client_card_images_and_symbols_for_df,
+    write_symbol_atlas,
+)
+from fetcher.promos import fetch_promo_cards
+from fetcher.scheduler import Stage, StageCache, run_stages
+
+# The build as a graph of stages, run by the scheduler. Downloads overlap with the CPU bound stages that
+# don't need them (keywords and similar cards are computed while card images download), and the CPU bound
+# stages are skipped when their inputs haven't changed since the last build
+
+# Stages that use each resource at once. Downloads are I/O bound, so two download stages can share the
+# network. CPU bound stages mostly hold the GIL, so running more than one on threads wouldn't be faster
+# (image variants spread their own work across processes)
+NETWORK_STAGE_BUDGET = 2
+CPU_STAGE_BUDGET = 1
+
+
+def get_card_image_files(cards_df):
+    # {id: [size, modified time]} of every downloaded card image, so stages that read them rerun when they change
+    settings = config.get_settings()
+    card_image_files = {}
+    for card_id in cards_df['id']:
+        stat = os.stat(settings.card_images_directory + "/" + card_id + ".png")
+        card_image_files[card_id] = [stat.st_size, stat.st_mtime_ns]
+    return card_image_files
+
+
+def run_card_images_stage(inputs):
+    download_missing_card_images_for_df(inputs['cards'])
+    return {'card_image_files': get_card_image_files(inputs['cards'])}
+
+
+def run_sprites_stage(inputs):
+    download_missing_sprites_for_df(inputs['cards'])
+    return {}
+
+
+def run_client_card_images_stage(inputs):
+    client_card_image_files = write_client_card_images_and_symbols_for_df(inputs['cards'])
+    return {
+        'client_card_image_files': client_card_image_files,
+        'client_card_image_paths': list(client_card_image_files),
+    }
+
+
+def run_equivalence_class_ids_stage(inputs):
+    # Ids are kept in a file between builds, so the stage reruns if that file is gone
+    equivalence_class_ids = add_equivalence_class_ids_to_df(inputs['cards'])['equivalence_class_id']
+    return {
+        'equivalence_class_ids': [int(class_id) for class_id in equivalence_class_ids],
+        'equivalence_class_ids_paths': [config.get_settings().equivalence_class_ids_path],
+    }
+
+
+def run_image_variants_stage(inputs):
+    card_ids = list(inputs['cards']['id'])
+    image_variants = write_card_image_variants_for_ids(card_ids)
+    return {
+        'image_variants': image_variants,
+        'image_variant_paths': [
+            path for card_id, variants in zip(card_ids, image_variants)
+            for path in get_card_image_variant_paths(card_id, variants)
+        ],
+    }
+
+
+def run_symbol_atlases_stage(inputs):
+    settings = config.get_settings()
+    symbol_atlas_paths = []
+    for symbols_directory in [settings.client_trainer_symbols_directory, settings.client_special_energy_symbols_directory]:
+        symbol_paths = [path for path in inputs['client_card_image_files'] if os.path.dirname(path) == symbols_directory]
+        symbol_atlas_paths += write_symbol_atlas(symbols_directory, symbol_paths)
+    return {'symbol_atlas_paths': symbol_atlas_paths}
+
+
+def run_export_stage(inputs):
+    settings = config.get_settings()
+    # Columns are added in the same order as they always have been, which the card store keeps
+    cards_df = inputs['cards'].assign(
+        detection_keywords=inputs['detection_keywords'],
+        similar_card_ids=inputs['similar_card_ids'],
+        equivalence_class_id=inputs['equivalence_class_ids'],
+    )
+    cards_df = drop_export_only_columns(cards_df)
+    # Variants go last, after the columns that are only used while building have been dropped. Stored as
+    # {format: [widths]} rather than srcset strings to keep the database small - the client builds the srcset
+    cards_df = cards_df.assign(image_variants=inputs['image_variants'])
+
+    card_store_paths = write_card_store(cards_df)
+    write_card_database(cards_df)
+    write_card_database_patches()
+    return {
+        'export_paths': card_store_paths + [settings.client_card_database_path, settings.client_card_database_versions_path]
+    }
+
+
+def get_build_stages():
+    return [
+        Stage(
+            'sets', 'network',
+            lambda inputs: {'sets_with_cards': download_sets_with_cards()},
+            outputs=['sets_with_cards'],
+        ),
+        Stage(
+            'promos', 'network',
+            lambda inputs: {'promo_cards': fetch_promo_cards()},
+            outputs=['promo_cards'],
+        ),
+        Stage(
+            'cards', 'cpu',
+            lambda inputs: {'cards': get_cards_df(inputs['sets_with_cards'], inputs['promo_cards'])},
+            inputs=['sets_with_cards', 'promo_cards'],
+            outputs=['cards'],
+        ),
+        Stage('card_images', 'network', run_card_images_stage, inputs=['cards'], outputs=['card_image_files']),
+        Stage('sprites', 'network', run_sprites_stage, inputs=['cards']),
+        Stage(
+            'detection_keywords', 'cpu',
+            lambda inputs: {
+                'detection_keywords': add_detection_keywords_to_df(inputs['cards'])['detection_keywords'].tolist()
+            },
+            inputs=['cards'],
+            outputs=['detection_keywords'],
+            cacheable=True,
+        ),
+        Stage(
+            'similar_card_ids', 'cpu',
+            lambda inputs: {
+                'similar_card_ids': add_similar_card_ids_to_df(inputs['cards'])['similar_card_ids'].tolist()
+            },
+            inputs=['cards'],
+            outputs=['similar_card_ids'],
+            cacheable=True,
+        ),
+        Stage(
+            'equivalence_class_ids', 'cpu', run_equivalence_class_ids_stage,
+            inputs=['cards'],
+            outputs=['equivalence_class_ids', 'equivalence_class_ids_paths'],
+            cacheable=True,
+            written_paths_output='equivalence_class_ids_paths',
+        ),
+        Stage(
+            'client_card_images', 'cpu', run_client_card_images_stage,
+            inputs=['cards', 'card_image_files'],
+            outputs=['client_card_image_files', 'client_card_image_paths'],
+            cacheable=True,
+            written_paths_output='client_card_image_paths',
+        ),
+        Stage(
+            'image_variants', 'cpu', run_image_variants_stage,
+            inputs=['cards', 'card_image_files'],
+            outputs=['image_variants', 'image_variant_paths'],
+            cacheable=True,
+            written_paths_output='image_variant_paths',
+        ),
+        Stage(
+            'symbol_atlases', 'cpu', run_symbol_atlases_stage,
+            # Sizes and modified times of the cropped symbols, so a re-downloaded card image rebuilds the atlases
+            inputs=['client_card_image_files'],
+            outputs=['symbol_atlas_paths'],
+            cacheable=True,
+            written_paths_output='symbol_atlas_paths',
+        ),
+        Stage(
+            'export', 'cpu', run_export_stage,
+            inputs=['cards', 'detection_keywords', 'similar_card_ids', 'equivalence_class_ids', 'image_variants'],
+            outputs=['export_paths'],
+            cacheable=True,
+            written_paths_output='export_paths',
+        ),
+    ]
+
+
+def get_critical_path_seconds(stages, results):
+    # The longest chain of stages that had to wait for each other - the least time the build could take
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    stages_by_name = {stage.name: stage for stage in stages}
+    path_seconds = {}
+    # Results are in order of finishing, so every stage's dependencies come before it
+    for result in results:
+        dependencies = {producers[stage_input] for stage_input in stages_by_name[result.name].inputs}
+        path_seconds[result.name] = result.seconds + max(
+            [path_seconds[dependency] for dependency in dependencies], default=0
+        )
+    return max(path_seconds.values(), default=0)
+
+
+def build(network_budget=NETWORK_STAGE_BUDGET, cpu_budget=CPU_STAGE_BUDGET, use_cache=True):
+    settings = config.get_settings()
+    config.ensure_directories()
+
+    start_time = time.perf_counter()
+    stages = get_build_stages()
+    # Stages write to the configured directories, so results built for other directories aren't reused
+    cache = StageCache(settings.build_cache_directory, [settings.data_directory, settings.client_public_directory]) \
+        if use_cache else None
+    _, results = run_stages(stages, {'network': network_budget, 'cpu': cpu_budget}, cache)
+    seconds = time.perf_counter() - start_time
+
+    total_stage_seconds = sum(result.seconds for result in results)
+    critical_path_seconds = get_critical_path_seconds(stages, results)
+    print(
+        f"Built in {seconds:.1f}s: stages took {total_stage_seconds:.1f}s in total, "
+        f"{critical_path_seconds:.1f}s along the longest chain of dependent stages, "
+        f"{sum(result.skipped for result in results)} skipped"
+    )
+    with build_stats_lock:
+        build_stats['build'] = {
+            "seconds": seconds,
+            "total_stage_seconds": total_stage_seconds,
+            "critical_path_seconds": critical_path_seconds,
+            "stages": {
+                result.name: {
+                    "resource": result.resource,
+                    "skipped": result.skipped,
+                    "started": result.started,
+                    "seconds": result.seconds,
+                } for result in results
+            },
+        }
+        with open(settings.build_stats_path, 'w') as f:
+            json.dump(build_stats, f, indent=2, sort_keys=True)
+
+    print("Done!")
@@ -0,0 +1,312 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from fetcher.config import get_settings
+from fetcher.mechanics import get_card_mechanics_hashes
+from fetcher.names import (
+    basic_energy_regex,
+    basic_energy_replacement_regex,
+    boss_orders_named_regex,
+    compute_detection_keywords_for_name,
+    get_rarity_for_mismatch_correction,
+    owner_replacement_regex,
+    postfix_replacement_regex,
+    prefix_replacement_regex,
+    professors_research_named_regex,
+    set_id_to_official_code_overrides,
+)
+from fetcher.network import open_url
+from fetcher.promos import PROMO_SET_CONFIG
+
+# Builds the card dataframe and adds the columns computed across every card
+
+# Counts and timings from the build, written to settings.build_stats_path at the end for comparing runs.
+# Build stages run on several threads, so updates hold the lock
+build_stats = {}
+build_stats_lock = threading.Lock()
+
+
+def get_processed_names(names):
+    # Same as get_processed_name, over a whole column of names at once
+    names = names.str.replace("’", "'", regex=False)
+    is_professors_research = names.str.match(professors_research_named_regex)
+    is_boss_orders = names.str.match(boss_orders_named_regex) & ~is_professors_research
+    is_basic_energy = names.str.match(basic_energy_regex) & ~is_professors_research & ~is_boss_orders
+    names = names.mask(is_basic_energy, names.str.replace(basic_energy_replacement_regex, '', regex=True))
+    names = names.mask(is_boss_orders, "Boss's Orders")
+    return names.mask(is_professors_research, "Professor's Research")
+
+
+def get_normalized_names(raw_names):
+    # The name columns for each raw name - the name without prefix (and postfix) only applies to Pokémon,
+    # other cards keep their processed name
+    names = get_processed_names(raw_names)
+    names_with_owner_removed = names.str.replace(owner_replacement_regex, '', regex=True)
+    return pd.DataFrame({
+        "name": names,
+        "pokemon_name_without_prefix": names_with_owner_removed.str.replace(prefix_replacement_regex, '', regex=True),
+        "pokemon_name_without_prefix_and_postfix": names_with_owner_removed
+            .str.replace(postfix_replacement_regex, '', regex=True)
+            .str.replace(prefix_replacement_regex, '', regex=True),
+    })
+
+
+def get_column_values(column):
+    # Missing values become None, as they would be from card.get()
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def compute_per_unique_name(names, compute_for_unique_names, stat_name):
+    # Reprints and alternate arts share names, so work that only depends on the name is done once per
+    # distinct name. compute_for_unique_names takes a Series of distinct names and returns a Series or
+    # DataFrame with a row for each, which is expanded back to a row per name (with a fresh index)
+    start_time = time.perf_counter()
+    codes, unique_names = pd.factorize(pd.Series(names, dtype=object), use_na_sentinel=False)
+    unique_result = compute_for_unique_names(pd.Series(unique_names, dtype=object))
+    result = unique_result.take(codes).reset_index(drop=True)
+    seconds = time.perf_counter() - start_time
+
+    # Estimated from the measured cost per unique name, times the number of duplicates that weren't computed.
+    # This understates the saving for work that grows faster than the number of names (keywords compare
+    # every name against every other one) - measure_name_deduplication measures it instead
+    estimated_seconds_saved = seconds / max(len(unique_names), 1) * (len(codes) - len(unique_names))
+    with build_stats_lock:
+        stats = build_stats.setdefault('name_deduplication', {}).setdefault(stat_name, {
+            "total_names": 0, "unique_names": 0, "seconds": 0, "estimated_seconds_saved": 0
+        })
+        stats["total_names"] += len(codes)
+        stats["unique_names"] += len(unique_names)
+        stats["seconds"] += seconds
+        stats["estimated_seconds_saved"] += estimated_seconds_saved
+    message = f"Computed {stat_name} for {len(unique_names)} unique names across {len(codes)} cards in {seconds:.2f}s"
+    if get_settings().measure_name_deduplication:
+        # Does the work once per card too, to measure the time saved rather than estimating it
+        start_time = time.perf_counter()
+        compute_for_unique_names(pd.Series(names, dtype=object).reset_index(drop=True))
+        seconds_saved = time.perf_counter() - start_time - seconds
+        with build_stats_lock:
+            stats["seconds_saved"] = stats.get("seconds_saved", 0) + seconds_saved
+        message += f" ({seconds_saved:.2f}s saved)"
+    else:
+        message += f" (about {estimated_seconds_saved:.2f}s saved)"
+    print(message)
+    return result
+
+
+def get_sets_cards_df(sets_with_cards):
+    # Processes the cards from every (set_data, cards_in_set) pair a column at a time, giving the same
+    # rows as processing each card on its own. Doing all sets together keeps pandas overhead per column, not per set
+    cards_in_sets = [card for set_data, cards_in_set in sets_with_cards for card in cards_in_set]
+    if len(cards_in_sets) == 0:
+        return pd.DataFrame([])
+    raw_cards_df = pd.DataFrame(cards_in_sets)
+    num_cards = raw_cards_df.shape[0]
+
+    def get_set_column(get_set_value):
+        values = []
+        for set_data, cards_in_set in sets_with_cards:
+            values += [get_set_value(set_data)] * len(cards_in_set)
+        return values
+
+    def get_raw_column(column_name):
+        if column_name not in raw_cards_df.columns:
+            return pd.Series([None] * num_cards, index=raw_cards_df.index, dtype=object)
+        return raw_cards_df[column_name]
+
+    supertypes = get_raw_column('supertype')
+    is_pokemon = supertypes == 'Pokémon'
+    normalized_names = compute_per_unique_name(get_raw_column('name'), get_normalized_names, 'normalized names')
+    names = normalized_names['name']
+    names_without_prefix = names.mask(is_pokemon, normalized_names['pokemon_name_without_prefix'])
+    names_without_prefix_and_postfix = names.mask(is_pokemon, normalized_names['pokemon_name_without_prefix_and_postfix'])
+    evolves_from = get_raw_column('evolvesFrom')
+    evolves_from = evolves_from.mask(evolves_from.notna(), get_processed_names(evolves_from.fillna('')))
+
+    card_ids = get_column_values(get_raw_column('id'))
+    rarities = get_column_values(get_raw_column('rarity'))
+
+    pokemon_positions = [position for position, pokemon in enumerate(is_pokemon) if pokemon]
+    mechanics_hashes = [None] * num_cards
+    for position, mechanics_hash in zip(
+        pokemon_positions,
+        get_card_mechanics_hashes([cards_in_sets[position] for position in pokemon_positions])
+    ):
+        mechanics_hashes[position] = mechanics_hash
+
+    return pd.DataFrame({
+        "id": card_ids,
+        "name": get_column_values(names),
+        "name_without_prefix": get_column_values(names_without_prefix),
+        "name_without_prefix_and_postfix": get_column_values(names_without_prefix_and_postfix),
+        "supertype": get_column_values(supertypes),
+        "subtypes": [subtypes if subtypes is not None else [] for subtypes in get_column_values(get_raw_column('subtypes'))],
+        "rarity": rarities,
+        "rarity_for_mismatch_correction": [
+            get_rarity_for_mismatch_correction(card_id, rarity) for card_id, rarity in zip(card_ids, rarities)
+        ],
+        "hp": get_column_values(get_raw_column('hp')),
+        "set_id": get_set_column(lambda set_data: set_data.get('id')),
+        "set_code": get_set_column(
+            lambda set_data: set_id_to_official_code_overrides[set_data.get('id')] if set_data.get('id') in set_id_to_official_code_overrides else set_data.get('ptcgoCode')
+        ),
+        "regulation_mark": get_column_values(get_raw_column('regulationMark')),
+        "set_name": get_set_column(lambda set_data: set_data.get('name')),
+        "number": get_column_values(get_raw_column('number')),
+        "set_printed_total": get_set_column(lambda set_data: set_data.get('printedTotal')),
+        "small_image_url": [
+            images.get('small') if images is not None else None for images in get_column_values(get_raw_column('images'))
+        ],
+        "types": get_column_values(get_raw_column('types')),
+        "national_pokedex_numbers": get_column_values(get_raw_column('nationalPokedexNumbers')),
+        "evolves_from": get_column_values(evolves_from),
+        # weird hack - we only use this to match between cards in order to warn users about similar cards that *may* only differ by set info
+        "concatenated_attack_names": [
+            '_'.join([attack.get('name') for attack in attacks]) if attacks else None
+            for attacks in get_column_values(get_raw_column('attacks'))
+        ],
+        "cardMechanicsHash": mechanics_hashes,
+    })
+
+
+def download_sets_with_cards(): # Returns (set_data, cards_in_set) pairs
+    sets_with_cards = []
+    total_downloaded_cards = 0
+
+    # get the set info directly from github, to avoid computationally expensive calls to the API
+    sets_url = "https://raw.githubusercontent.com/PokemonTCG/pokemon-tcg-data/refs/heads/master/sets/en.json"
+    sets_data = json.load(open_url(sets_url))
+    
+    # only Scarlet & Violet and Mega Evolution sets are currently supported 
+    sets_data = [s for s in sets_data if s['series'] == 'Scarlet & Violet' or s['series'] == 'Mega Evolution']
+
+    for set_data in sets_data:
+        set_id = set_data['id']
+        if set_id in PROMO_SET_CONFIG:
+            continue
+        print("Downloading info for set " + set_id + " (" + set_data['name'] + ")")
+        set_url = "https://raw.githubusercontent.com/PokemonTCG/pokemon-tcg-data/refs/heads/master/cards/en/" + set_id + ".json"
+        cards_in_set = json.load(open_url(set_url))
+        sets_with_cards.append((set_data, cards_in_set))
+        total_downloaded_cards = total_downloaded_cards + len(cards_in_set)
+        print("Downloaded info for " + str(total_downloaded_cards) + " cards")
+
+    return sets_with_cards
+
+
+# Around 5000 cards last time I ran this!
+def get_cards_df(sets_with_cards, promo_cards): # Returns dataframe
+    # The downloaded set cards and promos as one dataframe, without touching the network
+    dfs_list = [get_sets_cards_df(sets_with_cards)]
+
+    promo_cards_df = pd.DataFrame(promo_cards)
+    if not promo_cards_df.empty:
+        dfs_list.append(promo_cards_df)
+
+    concatenated_df = pd.concat(dfs_list, ignore_index=True)
+
+    # Sort the concatenated dataframe so all common, uncommons, and rares are at the beginning
+    # Read the rarity from the 'rarity' column, and sort by that
+    # This makes certain types of postprocessing easier
+    rarity_order = {
+        'Common': 1,
+        'Uncommon': 2,
+        'Rare': 3,
+        'Rare Holo': 4,
+        'Double Rare': 5,
+    }
+    concatenated_df['rarity_order'] = concatenated_df['rarity'].map(rarity_order).fillna(11)  # Fill unspecified rarities with a high number
+    # Stable, so cards with the same rarity keep the order they were fetched in from run to run
+    concatenated_df = concatenated_df.sort_values(by=['rarity_order'], kind='stable')
+
+    print("Finished downloading info for " + str(concatenated_df.shape[0]) + " cards")
+    return concatenated_df
+
+
+def add_detection_keywords_to_df(cards_df):
+    # function that adds a column to the df to help speed up detection
+    # Keywords only depend on the name and the set of all names, so each distinct name is done once
+    def compute_detection_keywords_for_names(unique_names):
+        all_names = unique_names.tolist()
+        return pd.Series([compute_detection_keywords_for_name(name, all_names) for name in all_names], dtype=object)
+
+    detection_keywords = compute_per_unique_name(cards_df['name'], compute_detection_keywords_for_names, 'detection keywords')
+    cards_df = cards_df.assign(detection_keywords=detection_keywords.tolist())
+    return cards_df
+
+
+def add_similar_card_ids_to_df(cards_df):
+    # function that adds a column to the df to help tell the user if they might be mis-scanning a card
+    
+    # group together cards with the same mechanics hash
+    # if these match, the cards are mechanically identical and can safely swap art
+    cards_df = cards_df.assign(
+        similar_card_ids = cards_df.apply(
+            lambda row: cards_df[
+                (row['cardMechanicsHash'] is not None) &
+                (cards_df['cardMechanicsHash'] == row['cardMechanicsHash']) &
+                (cards_df['id'] != row['id'])
+            ]['id'].tolist(),
+            axis=1
+        )
+    )
+    return cards_df
+
+
+def load_equivalence_class_ids():
+    if not os.path.isfile(get_settings().equivalence_class_ids_path):
+        return {}
+    with open(get_settings().equivalence_class_ids_path) as f:
+        return json.load(f)
+
+
+def save_equivalence_class_ids(equivalence_class_ids):
+    equivalence_class_ids_path = get_settings().equivalence_class_ids_path
+    with open(equivalence_class_ids_path + '.part', 'w') as f:
+        json.dump(equivalence_class_ids, f, indent=2, sort_keys=True)
+    os.replace(equivalence_class_ids_path + '.part', equivalence_class_ids_path)
+
+
+def add_equivalence_class_ids_to_df(cards_df):
+    # Integer ids for groups of cards that are interchangeable in a deck, so deck comparison can work
+    # on small integers instead of resolving card identities. Matches getCardComparisonKey in the client:
+    # Pokémon by mechanics hash (or id, if there's no hash), Trainers and Energy by name.
+    # Clients and database patches compare ids across builds, so every key keeps the id it was first given
+    # (kept in settings.equivalence_class_ids_path) and only new keys get new ids - never reusing old ones.
+    # Bumping MECHANICS_HASH_VERSION changes every Pokémon key, so those all get new ids
+    comparison_keys = ('name:' + cards_df['name']).where(
+        cards_df['supertype'] != 'Pokémon',
+        ('mechanics:' + cards_df['cardMechanicsHash']).fillna('id:' + cards_df['id'])
+    )
+    codes, unique_keys = pd.factorize(comparison_keys)
+    equivalence_class_ids = load_equivalence_class_ids()
+    next_class_id = max(equivalence_class_ids.values(), default=-1) + 1
+    new_keys = [key for key in unique_keys if key not in equivalence_class_ids]
+    for key in new_keys:
+        equivalence_class_ids[key] = next_class_id
+        next_class_id += 1
+    if new_keys or not os.path.isfile(get_settings().equivalence_class_ids_path):
+        save_equivalence_class_ids(equivalence_class_ids)
+    class_ids = np.array([equivalence_class_ids[key] for key in unique_keys], dtype=np.int64).take(codes)
+    print(f"Grouped {len(cards_df)} cards into {len(unique_keys)} equivalence classes ({len(new_keys)} new)")
+    return cards_df.assign(equivalence_class_id=class_ids)
+
+
+# Intermediate mechanics fields, dropped before export; only the hash is used by the client
+EXPORT_ONLY_COLUMNS = [
+    'concatenated_attack_names',
+    'rarity_for_mismatch_correction',
+    'abilities',
+    'attacks',
+    'weaknesses',
+    'resistances',
+    'retreatCost',
+]
+
+
+def drop_export_only_columns(cards_df):
+    return cards_df.drop(columns=[column for column in EXPORT_ONLY_COLUMNS if column in cards_df.columns])
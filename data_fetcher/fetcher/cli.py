@@ -0,0 +1,49 @@
+import argparse
+
+from fetcher import config
+
+# The command line for the full build (fetcher/build.py), run by fetch_data.py. The build is imported once
+# the arguments have been parsed, so '--help' and bad arguments return straight away
+
+
+def parse_budget(value):
+    # A budget of 0 would leave stages using that resource waiting forever
+    budget = int(value)
+    if budget < 1:
+        raise argparse.ArgumentTypeError(f"need a budget of at least 1, got {budget}")
+    return budget
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch card data and images, and write everything the client serves')
+    parser.add_argument('--data-directory', default=None,
+                        help='Downloads, caches and outputs that aren\'t served (default ./data)')
+    parser.add_argument('--client-public-directory', default=None,
+                        help='Where the client\'s served files go (default ./../client/public)')
+    parser.add_argument('--http-mode', choices=['live', 'record', 'replay'], default=None,
+                        help='Defaults to FETCH_DATA_HTTP_MODE, or live')
+    parser.add_argument('--http-archive', default=None,
+                        help='Archive to record to or replay from (default http_archive.zip in the data directory)')
+    parser.add_argument('--measure-name-deduplication', action='store_true', default=None,
+                        help='Also time per name work once per card, written to build_stats.json')
+    parser.add_argument('--network-budget', type=parse_budget, default=None,
+                        help='Download stages to run at once (default 2)')
+    parser.add_argument('--cpu-budget', type=parse_budget, default=None,
+                        help='CPU bound stages to run at once (default 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Run every stage, even if its inputs haven\'t changed since the last build')
+    args = parser.parse_args(argv)
+
+    build_options = {
+        'network_budget': args.network_budget,
+        'cpu_budget': args.cpu_budget,
+        'use_cache': not args.no_cache,
+    }
+    for name in ['network_budget', 'cpu_budget', 'no_cache']:
+        delattr(args, name)
+    config.configure(**{
+        name: value for name, value in vars(args).items() if value is not None
+    })
+
+    from fetcher.build import build
+    build(**{name: value for name, value in build_options.items() if value is not None})
@@ -0,0 +1,126 @@
+import dataclasses
+import os
+from dataclasses import dataclass, field
+
+# Where the fetcher reads and writes, and how it reaches the network. Nothing is created when this is imported -
+# ensure_directories is called by the build once it knows where its outputs go.
+# Defaults are relative to the working directory, for running from 'data_fetcher'
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Downloads, caches and build outputs that aren't served
+    data_directory: str = './data'
+    # Everything the client serves
+    client_public_directory: str = './../client/public'
+    # 'live' fetches everything from the network
+    # 'record' does the same, but also saves every response to http_archive_path
+    # 'replay' serves every response from http_archive_path, without touching the network
+    http_mode: str = field(default_factory=lambda: os.environ.get('FETCH_DATA_HTTP_MODE', 'live'))
+    # Defaults to http_archive.zip in the data directory
+    http_archive: str = field(default_factory=lambda: os.environ.get('FETCH_DATA_HTTP_ARCHIVE'))
+    # Also do per name work once per card, to measure how much time deduplicating by name saves
+    measure_name_deduplication: bool = field(
+        default_factory=lambda: os.environ.get('FETCH_DATA_MEASURE_NAME_DEDUPLICATION') == '1'
+    )
+
+    @property
+    def http_archive_path(self):
+        return self.http_archive or self.data_directory + '/http_archive.zip'
+
+    @property
+    def card_images_directory(self):
+        return self.data_directory + '/card-images'
+
+    @property
+    def sprites_directory(self):
+        return self.data_directory + '/sprites'
+
+    @property
+    def sprite_index_path(self):
+        return self.data_directory + '/sprite_index.json'
+
+    @property
+    def promo_species_number_cache_path(self):
+        return self.data_directory + '/pokeapi_species_numbers.json'
+
+    @property
+    def build_stats_path(self):
+        # Counts and timings from the build, written out at the end for comparing runs
+        return self.data_directory + '/build_stats.json'
+
+    @property
+    def equivalence_class_ids_path(self):
+        # Equivalence class id of every comparison key ever seen, so ids stay the same between builds
+        return self.data_directory + '/equivalence_class_ids.json'
+
+    @property
+    def build_cache_directory(self):
+        # Outputs of build stages, reused when their inputs haven't changed
+        return self.data_directory + '/build_cache'
+
+    @property
+    def card_store_directory(self):
+        # Memory mapped copy of the database for Python tooling, read by simulations/cardStore.py
+        return self.data_directory + '/card_store'
+
+    @property
+    def card_database_history_directory(self):
+        # Previous databases are kept so returning clients can download a patch instead of the whole database
+        return self.data_directory + '/card_database_history'
+
+    @property
+    def client_card_images_directory(self):
+        return self.client_public_directory + '/cards'
+
+    @property
+    def client_special_energy_symbols_directory(self):
+        return self.client_public_directory + '/special-energy-symbols'
+
+    @property
+    def client_trainer_symbols_directory(self):
+        return self.client_public_directory + '/trainer-symbols'
+
+    @property
+    def client_sprites_directory(self):
+        return self.client_public_directory + '/sprites'
+
+    @property
+    def client_card_database_path(self):
+        return self.client_public_directory + '/card_database.json'
+
+    @property
+    def client_card_database_versions_path(self):
+        return self.client_public_directory + '/card_database_versions.json'
+
+    @property
+    def client_card_database_patches_directory(self):
+        return self.client_public_directory + '/card_database_patches'
+
+
+settings = Settings()
+
+
+def get_settings():
+    return settings
+
+
+def configure(**changes):
+    # Replaces the given settings for everything that runs afterwards in this process.
+    # Worker processes don't see this, so anything they need is passed to them explicitly
+    global settings
+    settings = dataclasses.replace(settings, **changes)
+    return settings
+
+
+def ensure_directories():
+    for directory in [
+        settings.card_images_directory,
+        settings.sprites_directory,
+        settings.client_card_images_directory,
+        settings.client_special_energy_symbols_directory,
+        settings.client_trainer_symbols_directory,
+        settings.client_sprites_directory,
+    ]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from fetcher.cards import get_column_values
+from fetcher.config import get_settings
+from fetcher.mechanics import MECHANICS_HASH_VERSION
+
+# Everything written from the finished dataframe: the client database, its patches and the card store
+
+CARD_STORE_VERSION = 2
+# Data files of the card store, named with the build id (see write_card_store)
+CARD_STORE_DATA_FILES = ['cards-{}.npy', 'heap-{}.bin', 'id_order-{}.npy']
+CARD_DATABASE_HISTORY_SIZE = 10
+# A patch changing more than this share of the cards usually means ids or hashes were renumbered across the
+# whole database (like the equivalence class ids before they were kept between builds), which is worth a look
+CARD_DATABASE_PATCH_WARNING_CHANGED_SHARE = 0.5
+
+def get_card_store_kind(column):
+    if pd.api.types.is_bool_dtype(column):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(column):
+        return 'int'
+    if pd.api.types.is_float_dtype(column):
+        return 'float'
+    if all(value is None or isinstance(value, str) for value in get_column_values(column)):
+        return 'string'
+    return 'json'
+
+
+def get_card_store_build_id(directory):
+    # Build id of the store the schema in the directory points to, or None if there isn't one
+    if not os.path.isfile(directory + '/schema.json'):
+        return None
+    with open(directory + '/schema.json') as f:
+        return json.load(f).get('build_id')
+
+
+def write_card_store(cards_df, directory=None):
+    # Writes the layout described in simulations/cardStore.py. The data files are named with a build id (a hash
+    # of their contents) and only published by renaming schema.json, which names that id, into place - so a
+    # reader that opens the store mid-swap, or after a crash, gets the old store or the new one, never a mix.
+    # The previous build's files are kept for readers that read its schema just before the swap.
+    # Returns the paths of the files that make up the store
+    directory = directory or get_settings().card_store_directory
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    # Same as the exported database, where only Pokémon keep their mechanics hash
+    cards_df = cards_df.assign(
+        cardMechanicsHash=cards_df['cardMechanicsHash'].astype(object).where(cards_df['supertype'] == 'Pokémon', None)
+    )
+    heap_pieces = []
+    heap_size = 0
+    kinds = {}
+    field_values = {}
+    for column in cards_df.columns:
+        kinds[column] = get_card_store_kind(cards_df[column])
+        if kinds[column] not in ['string', 'json']:
+            field_values[column] = cards_df[column].to_numpy()
+            continue
+        offsets_and_lengths = []
+        for value in get_column_values(cards_df[column]):
+            if value is None:
+                offsets_and_lengths.append((heap_size, -1))
+                continue
+            encoded = (value if kinds[column] == 'string' else json.dumps(value, ensure_ascii=False)).encode('utf-8')
+            offsets_and_lengths.append((heap_size, len(encoded)))
+            heap_pieces.append(encoded)
+            heap_size += len(encoded)
+        field_values[column] = offsets_and_lengths
+
+    heap_field_dtype = np.dtype([('offset', '<u4'), ('length', '<i4')])
+    field_dtypes = {'bool': np.dtype('?'), 'int': np.dtype('<i8'), 'float': np.dtype('<f8')}
+    records = np.zeros(len(cards_df), dtype=[
+        (column, field_dtypes.get(kind, heap_field_dtype)) for column, kind in kinds.items()
+    ])
+    for column, values in field_values.items():
+        records[column] = np.array(values, dtype=records.dtype[column])
+    card_ids = cards_df['id'].tolist()
+    id_order = np.array(sorted(range(len(card_ids)), key=card_ids.__getitem__), dtype='<i4')
+
+    heap = b''.join(heap_pieces)
+    build_id = hashlib.sha256(heap + records.tobytes() + id_order.tobytes()).hexdigest()[:16]
+    previous_build_id = get_card_store_build_id(directory)
+    data_file_names = [file_name.format(build_id) for file_name in CARD_STORE_DATA_FILES]
+
+    for file_name, write in [
+        (data_file_names[0], lambda f: np.save(f, records)),
+        (data_file_names[1], lambda f: f.write(heap)),
+        (data_file_names[2], lambda f: np.save(f, id_order)),
+        ('schema.json', lambda f: f.write(json.dumps({
+            "version": CARD_STORE_VERSION,
+            "build_id": build_id,
+            "mechanics_hash_version": MECHANICS_HASH_VERSION,
+            "rows": len(cards_df),
+            "heap_size": heap_size,
+            "columns": kinds,
+        }).encode('utf-8'))),
+    ]:
+        with open(directory + '/' + file_name + '.part', 'wb') as f:
+            write(f)
+        os.replace(directory + '/' + file_name + '.part', directory + '/' + file_name)
+
+    kept_file_names = set(data_file_names + ['schema.json'])
+    if previous_build_id is not None:
+        kept_file_names.update(file_name.format(previous_build_id) for file_name in CARD_STORE_DATA_FILES)
+    for file_name in os.listdir(directory):
+        if file_name not in kept_file_names:
+            os.remove(directory + '/' + file_name)
+    print(f"Wrote card store {build_id} with {len(cards_df)} cards and a {heap_size / 1_000_000:.1f} MB string heap to {directory}")
+    return [directory + '/' + file_name for file_name in data_file_names + ['schema.json']]
+
+
+def write_card_database(cards_df, path=None):
+    # Writes {id: card} a card at a time from the columns, so the database is never built up as Python dicts.
+    # Keys are sorted within each card and cards keep their order, so unchanged rebuilds give identical bytes.
+    # Only Pokémon have a mechanics hash (and its version) in the client
+    path = path or get_settings().client_card_database_path
+    start_time = time.perf_counter()
+    is_pokemon = (cards_df['supertype'] == 'Pokémon').tolist()
+    columns = {column: get_column_values(cards_df[column]) for column in cards_df.columns}
+    columns['cardMechanicsHashVersion'] = [MECHANICS_HASH_VERSION if pokemon else None for pokemon in is_pokemon]
+    keys = sorted(columns)
+    card_encoder = json.JSONEncoder(sort_keys=True)
+
+    # Like building a dict, a repeated id keeps the position of its first row and the values of its last
+    row_for_id = {}
+    for row, card_id in enumerate(columns['id']):
+        row_for_id[card_id] = row
+
+    with open(path + '.part', 'w') as f:
+        f.write('{')
+        for index, (card_id, row) in enumerate(row_for_id.items()):
+            card = {key: columns[key][row] for key in keys}
+            if not is_pokemon[row]:
+                card.pop('cardMechanicsHash', None)
+                card.pop('cardMechanicsHashVersion')
+            f.write((', ' if index > 0 else '') + card_encoder.encode(card_id) + ': ' + card_encoder.encode(card))
+        f.write('}')
+    os.replace(path + '.part', path)
+    print(f"Wrote {len(row_for_id)} cards to {path} in {time.perf_counter() - start_time:.2f}s")
+
+
+def get_card_database_version(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def get_card_database_patch(old_cards, new_cards, from_version, to_version):
+    # Applied by applyCardDatabasePatch in the client (StorageManager.tsx):
+    # - removed: ids to drop
+    # - changed: {id: {"set": {field: value}, "unset": [field]}}
+    # - added: [position in the new database, id, card], in order of position
+    # - order: every id in order, only if cards that are in both databases were reordered
+    old_ids = list(old_cards)
+    new_ids = list(new_cards)
+    removed = [card_id for card_id in old_ids if card_id not in new_cards]
+    added = [[position, card_id, new_cards[card_id]] for position, card_id in enumerate(new_ids) if card_id not in old_cards]
+    changed = {}
+    for card_id in new_ids:
+        old_card = old_cards.get(card_id)
+        if old_card is None or old_card == new_cards[card_id]:
+            continue
+        new_card = new_cards[card_id]
+        changed[card_id] = {
+            "set": {field: value for field, value in new_card.items() if field not in old_card or old_card[field] != value},
+            "unset": [field for field in old_card if field not in new_card],
+        }
+    patch = {"from": from_version, "to": to_version, "removed": removed, "changed": changed, "added": added}
+    if [card_id for card_id in old_ids if card_id in new_cards] != [card_id for card_id in new_ids if card_id in old_cards]:
+        patch["order"] = new_ids
+    return patch
+
+
+def write_card_database_patches(path=None):
+    # Adds the database at path to the history, then writes a patch between each consecutive pair of versions
+    # in the history and a manifest of them ({"latest", "patches": {from version: patch path}}) for the client
+    settings = get_settings()
+    path = path or settings.client_card_database_path
+    for directory in [settings.card_database_history_directory, settings.client_card_database_patches_directory]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+    history_index_path = settings.card_database_history_directory + '/history.json'
+    history = []
+    if os.path.isfile(history_index_path):
+        with open(history_index_path) as f:
+            history = json.load(f)
+
+    version = get_card_database_version(path)
+    if len(history) == 0 or history[-1] != version:
+        shutil.copy(path, settings.card_database_history_directory + '/' + version + '.json')
+        history = [old_version for old_version in history if old_version != version] + [version]
+    for old_version in history[:-CARD_DATABASE_HISTORY_SIZE]:
+        os.remove(settings.card_database_history_directory + '/' + old_version + '.json')
+    history = history[-CARD_DATABASE_HISTORY_SIZE:]
+    with open(history_index_path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+    patches = {}
+    patch_file_names = []
+    patch_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    for from_version, to_version in zip(history, history[1:]):
+        patch_file_name = from_version + '-' + to_version + '.json'
+        patch_path = settings.client_card_database_patches_directory + '/' + patch_file_name
+        if not os.path.isfile(patch_path):
+            with open(settings.card_database_history_directory + '/' + from_version + '.json') as f:
+                old_cards = json.load(f)
+            with open(settings.card_database_history_directory + '/' + to_version + '.json') as f:
+                new_cards = json.load(f)
+            patch = get_card_database_patch(old_cards, new_cards, from_version, to_version)
+            with open(patch_path + '.part', 'w', encoding='utf-8') as f:
+                f.write(patch_encoder.encode(patch))
+            os.replace(patch_path + '.part', patch_path)
+            print(
+                f"Wrote patch {patch_file_name}: {len(patch['added'])} added, {len(patch['changed'])} changed, "
+                f"{len(patch['removed'])} removed ({os.path.getsize(patch_path) / 1000:.1f} kB, "
+                f"database is {os.path.getsize(path) / 1000:.1f} kB)"
+            )
+            if len(patch['changed']) > CARD_DATABASE_PATCH_WARNING_CHANGED_SHARE * len(new_cards):
+                field_counts = {}
+                for card_changes in patch['changed'].values():
+                    for field in list(card_changes['set']) + card_changes['unset']:
+                        field_counts[field] = field_counts.get(field, 0) + 1
+                most_changed_fields = sorted(field_counts.items(), key=lambda item: -item[1])[:5]
+                print(
+                    f"Warning: patch {patch_file_name} changes {len(patch['changed'])} of {len(new_cards)} cards, "
+                    f"most often {', '.join(f'{field} ({count})' for field, count in most_changed_fields)}"
+                )
+        patch_file_names.append(patch_file_name)
+        # Clients that can't patch their way to the latest version download the whole database instead,
+        # which is no slower than a patch that isn't smaller than it
+        if os.path.getsize(patch_path) < os.path.getsize(settings.card_database_history_directory + '/' + to_version + '.json'):
+            patches[from_version] = os.path.basename(settings.client_card_database_patches_directory) + '/' + patch_file_name
+        else:
+            print(f"Not publishing patch {patch_file_name}, since it isn't smaller than the database")
+    for file_name in os.listdir(settings.client_card_database_patches_directory):
+        if file_name not in patch_file_names:
+            os.remove(settings.client_card_database_patches_directory + '/' + file_name)
+
+    with open(settings.client_card_database_versions_path + '.part', 'w') as f:
+        json.dump({"latest": version, "patches": patches}, f, indent=2)
+    os.replace(settings.client_card_database_versions_path + '.part', settings.client_card_database_versions_path)
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, features
+
+from fetcher.config import get_settings
+
+# Card images are also written as smaller, modern format variants for the client to pick from with srcset.
+# Variants wider than the downloaded image are skipped, and AVIF is only produced if Pillow was built with it.
+# Encoding runs in spawned worker processes, which only import this module and Pillow. They're spawned rather
+# than forked since the build runs other stages on threads at the same time, and forking a process with
+# running threads can copy locks that are held
+
+CARD_IMAGE_VARIANT_WIDTHS = [120, 245]
+CARD_IMAGE_VARIANT_QUALITY = {'avif': 50, 'webp': 75}
+
+
+@lru_cache(maxsize=None)
+def get_card_image_variant_formats():
+    return ['avif', 'webp'] if features.check('avif') else ['webp']
+
+
+def get_card_image_variant_file_name(card_id, width, image_format):
+    return f"{card_id}-{width}w.{image_format}"
+
+
+def get_card_image_variant_widths(image_width):
+    return [width for width in CARD_IMAGE_VARIANT_WIDTHS if width <= image_width] or [image_width]
+
+
+def write_card_image_variants(card_id, card_images_directory, client_card_images_directory):
+    # Returns {format: [widths]} for the variants of this card's image, only re-encoding stale ones.
+    # Directories are passed in rather than read from the settings, which workers don't share
+    img_path = card_images_directory + "/" + card_id + ".png"
+    source_modified_time = os.path.getmtime(img_path)
+    with Image.open(img_path) as img:
+        img = img.convert('RGBA')
+        widths = get_card_image_variant_widths(img.width)
+        for width in widths:
+            resized = None
+            for image_format in get_card_image_variant_formats():
+                variant_path = client_card_images_directory + "/" + get_card_image_variant_file_name(card_id, width, image_format)
+                if os.path.isfile(variant_path) and os.path.getmtime(variant_path) >= source_modified_time:
+                    continue
+                if resized is None:
+                    resized = img if width == img.width else img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+                resized.save(variant_path + '.part', format=image_format.upper(), quality=CARD_IMAGE_VARIANT_QUALITY[image_format])
+                os.replace(variant_path + '.part', variant_path)
+    return {image_format: widths for image_format in get_card_image_variant_formats()}
+
+
+def get_card_image_variant_paths(card_id, image_variants):
+    return [
+        get_settings().client_card_images_directory + "/" + get_card_image_variant_file_name(card_id, width, image_format)
+        for image_format, widths in image_variants.items()
+        for width in widths
+    ]
+
+
+def write_card_image_variants_for_ids(card_ids):
+    # Encoding is CPU bound, so it's spread across processes. Returns the variants of each card, in order
+    print("Writing card image variants (" + ", ".join(get_card_image_variant_formats()) + ")")
+    start_time = time.perf_counter()
+    settings = get_settings()
+    card_ids = list(card_ids)
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as executor:
+        image_variants = list(executor.map(
+            write_card_image_variants,
+            card_ids,
+            [settings.card_images_directory] * len(card_ids),
+            [settings.client_card_images_directory] * len(card_ids),
+            chunksize=32
+        ))
+    print(f"Wrote card image variants for {len(card_ids)} cards in {time.perf_counter() - start_time:.1f}s")
+    return image_variants
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import shutil
+
+from PIL import Image, ImageDraw
+
+from fetcher.cards import compute_per_unique_name
+from fetcher.config import get_settings
+from fetcher.names import BASIC_ENERGY_NAMES, convert_int_or_infinity, get_sprite_file_name, sprite_url_replacement_regex
+from fetcher.network import download_url_to_file, download_urls_to_files, try_download_url_to_file
+
+# Card images, sprites and the symbols cropped from card images, copied into the client
+
+# The 32px trainer and energy symbols are packed into atlases, next to their directories
+SYMBOL_ATLAS_MAX_WIDTH = 2048
+
+
+def load_sprite_index():
+    if not os.path.isfile(get_settings().sprite_index_path):
+        return {}
+    with open(get_settings().sprite_index_path) as f:
+        return json.load(f)
+
+
+def save_sprite_index(sprite_index):
+    # Written to a temporary file and swapped in, so a crash can't leave a truncated index
+    sprite_index_path = get_settings().sprite_index_path
+    with open(sprite_index_path + '.part', 'w') as f:
+        json.dump(sprite_index, f, indent=2, sort_keys=True)
+    os.replace(sprite_index_path + '.part', sprite_index_path)
+
+
+def download_missing_sprites_for_df(cards_df):
+    print("Resolving sprites")
+    settings = get_settings()
+    # Many cards share a sprite, so dedupe by sprite file name before doing any I/O
+    national_pokedex_numbers_by_sprite_file_name = {}
+    pokemon_df = cards_df[cards_df['supertype'] == 'Pokémon']
+    sprite_file_names = compute_per_unique_name(
+        pokemon_df['name_without_prefix_and_postfix'],
+        lambda names: names.map(get_sprite_file_name),
+        'sprite file names'
+    )
+    for sprite_file_name, national_pokedex_numbers in zip(sprite_file_names, pokemon_df['national_pokedex_numbers']):
+        if not national_pokedex_numbers_by_sprite_file_name.get(sprite_file_name):
+            national_pokedex_numbers_by_sprite_file_name[sprite_file_name] = national_pokedex_numbers or []
+    print("Found " + str(len(national_pokedex_numbers_by_sprite_file_name)) + " unique sprites for " + str(pokemon_df.shape[0]) + " Pokémon")
+
+    # The index remembers where each sprite came from, including names limitless doesn't have,
+    # so later runs don't need to check the disk or retry 404s
+    sprite_index = load_sprite_index()
+    index_changed = False
+    # The index is saved once at the end, including when a download fails part way through
+    try:
+        for sprite_file_name, national_pokedex_numbers in national_pokedex_numbers_by_sprite_file_name.items():
+            sprite_path = settings.sprites_directory + '/' + sprite_file_name
+            entry = sprite_index.get(sprite_file_name)
+            if entry is None and os.path.isfile(sprite_path):
+                # Downloaded before the index existed
+                entry = {"local_path": sprite_path, "source_url": None, "limitless_not_found": False}
+            if entry is None or not os.path.isfile(entry['local_path']):
+                limitless_not_found = entry is not None and entry['limitless_not_found']
+                sprite_url = 'https://r2.limitlesstcg.net/pokemon/gen9/' + sprite_file_name
+                if not limitless_not_found:
+                    print("Downloading " + sprite_url + " to " + sprite_path)
+                    limitless_not_found = not try_download_url_to_file(sprite_url, sprite_path)
+                if limitless_not_found:
+                    if len(national_pokedex_numbers) == 0:
+                        raise ValueError(f"No national pokedex number available for sprite fallback: {sprite_file_name}")
+                    sprite_url = (
+                        "https://raw.githubusercontent.com/PokeAPI/sprites/master/"
+                        f"sprites/pokemon/other/home/{national_pokedex_numbers[0]}.png"
+                    )
+                    print("Sprite " + sprite_file_name + " not found by name, falling back to " + sprite_url)
+                    download_url_to_file(sprite_url, sprite_path)
+                entry = {"local_path": sprite_path, "source_url": sprite_url, "limitless_not_found": limitless_not_found}
+            if sprite_index.get(sprite_file_name) != entry:
+                sprite_index[sprite_file_name] = entry
+                index_changed = True
+            shutil.copy(entry['local_path'], settings.client_sprites_directory + "/" + sprite_file_name)
+    finally:
+        if index_changed:
+            save_sprite_index(sprite_index)
+
+
+def download_missing_card_images_for_df(cards_df):
+    print("Downloading image data")
+    settings = get_settings()
+    # Downloads images of cards for which the image does not already exist in the card images directory
+    # Naturally, this function will download all the images if none of them exist
+    missing_images = [
+        (small_image_url, settings.card_images_directory + "/" + card_id + ".png")
+        for card_id, small_image_url in zip(cards_df['id'], cards_df['small_image_url'])
+        if not os.path.isfile(settings.card_images_directory + "/" + card_id + ".png")
+    ]
+    print("Downloading " + str(len(missing_images)) + " missing card images")
+    download_urls_to_files(missing_images)
+
+
+def write_client_card_images_and_symbols_for_df(cards_df):
+    # Copies the downloaded card images into the client and crops symbols from them.
+    # Returns {path: [size, modified time]} of the files written, in the order they were first written,
+    # so anything that reads them (like the symbol atlases) can tell when their contents change
+    settings = get_settings()
+    written_paths = {}
+    for index, card in cards_df.iterrows():
+        file_name = card["id"] + ".png"
+        img_path = settings.card_images_directory + "/" + file_name
+        shutil.copy(img_path, settings.client_card_images_directory + "/" + file_name)
+        written_paths[settings.client_card_images_directory + "/" + file_name] = True
+
+        if card["supertype"] == 'Energy' and card['name'] not in BASIC_ENERGY_NAMES and convert_int_or_infinity(card['number']) <= card['set_printed_total']:
+            energy_symbol_file_name = re.sub(' ', '-', card['name']).lower()
+            energy_symbol_file_name = re.sub(sprite_url_replacement_regex, '', energy_symbol_file_name) + ".png"
+            energy_symbol_path = settings.client_special_energy_symbols_directory + "/" + energy_symbol_file_name
+            img = Image.open(img_path)
+            width, height = img.size
+            left = width * 0.87
+            upper = height * 0.07
+            right = width * 0.96
+            lower = height * 0.135
+            cropped = img.crop((left, upper, right, lower)) 
+            target_height = 32
+            target_width = int(cropped.width * (target_height / cropped.height))
+            cropped = cropped.resize((target_width, target_height), Image.LANCZOS)
+
+            # Crop the image to a circle
+            bigsize = (cropped.size[0] * 3, cropped.size[1] * 3)
+            mask = Image.new('L', bigsize, 0)
+            draw = ImageDraw.Draw(mask) 
+            draw.ellipse((0, 0) + bigsize, fill=255)
+            mask = mask.resize(cropped.size, Image.LANCZOS)
+            cropped.putalpha(mask)
+
+            cropped.convert('RGBA').save(energy_symbol_path)
+            written_paths[energy_symbol_path] = True
+
+        # Trainers for which we want to generate thumbnails
+        # Only generate thumbnails for trainers which aren't secret rares
+        # Unless they are supporters, in which case we want full arts where they are available
+        # This is because the character's face from a full art often looks better in thumbnail
+        # format as opposed to the upper body of the base rarity
+        if card["supertype"] == 'Trainer' and (convert_int_or_infinity(card['number']) <= card['set_printed_total'] 
+                                               or (card['rarity'] == 'Ultra Rare' and card['subtypes'] is not None and 'Supporter' in card['subtypes'])):
+            trainer_symbol_file_name = re.sub(' ', '-', card['name']).lower()
+            trainer_symbol_file_name = re.sub(sprite_url_replacement_regex, '', trainer_symbol_file_name) + ".png"
+            trainer_symbol_path = settings.client_trainer_symbols_directory + "/" + trainer_symbol_file_name
+            img = Image.open(img_path)
+            width, height = img.size
+            left = width * 0.075
+            upper = height * 0.14
+            right = width * 0.925
+            lower = height * 0.52
+            cropped = img.crop((left, upper, right, lower))
+            target_height = 32
+            target_width = int(cropped.width * (target_height / cropped.height))
+            cropped = cropped.resize((target_width, target_height), Image.LANCZOS)
+
+            # Crop the image to a rounded rectangle
+            bigsize = (cropped.size[0] * 3, cropped.size[1] * 3)
+            mask = Image.new('L', bigsize, 0)
+            draw = ImageDraw.Draw(mask) 
+            draw.rounded_rectangle(((0, 0), bigsize), bigsize[0] / 5, fill=255)
+
+            mask = mask.resize(cropped.size, Image.LANCZOS)
+            cropped.putalpha(mask)
+
+            cropped.convert('RGBA').save(trainer_symbol_path)
+            written_paths[trainer_symbol_path] = True
+
+    written_files = {}
+    for path in written_paths:
+        stat = os.stat(path)
+        written_files[path] = [stat.st_size, stat.st_mtime_ns]
+    return written_files
+
+
+def write_symbol_atlas(symbols_directory, symbol_paths):
+    # Packs the given symbols (the ones this build wrote, so stale files in the directory are left out) into rows
+    # of a single image, and writes an index of where each one is, which CardPreviewIcon in the client uses:
+    # {"width", "height", "symbols": {file_name: [x, y, width, height]}}. Returns the paths written
+    file_names = sorted(os.path.basename(path) for path in symbol_paths)
+    symbols = [Image.open(symbols_directory + "/" + file_name) for file_name in file_names]
+    positions = {}
+    x, y, row_height, atlas_width = 0, 0, 0, 0
+    for file_name, symbol in zip(file_names, symbols):
+        if x + symbol.width > SYMBOL_ATLAS_MAX_WIDTH:
+            x, y, row_height = 0, y + row_height, 0
+        positions[file_name] = [x, y, symbol.width, symbol.height]
+        x += symbol.width
+        row_height = max(row_height, symbol.height)
+        atlas_width = max(atlas_width, x)
+
+    atlas = Image.new('RGBA', (max(atlas_width, 1), max(y + row_height, 1)))
+    for file_name, symbol in zip(file_names, symbols):
+        atlas.paste(symbol.convert('RGBA'), tuple(positions[file_name][:2]))
+        symbol.close()
+    atlas.save(symbols_directory + "-atlas.png")
+    with open(symbols_directory + "-atlas.json", 'w') as f:
+        json.dump({"width": atlas.width, "height": atlas.height, "symbols": positions}, f)
+    print(f"Packed {len(file_names)} symbols into {symbols_directory}-atlas.png ({atlas.width}x{atlas.height})")
+    return [symbols_directory + "-atlas.png", symbols_directory + "-atlas.json"]
@@ -0,0 +1,81 @@
+import hashlib
+import json
+
+from fetcher.names import get_processed_name
+
+# Hashes of the mechanics of a card, which are the same for printings that can be swapped in a deck
+
+# Bump this whenever the encoding below changes, so clients can tell that every hash has changed
+MECHANICS_HASH_VERSION = 2
+
+# Fields are encoded as a JSON array in a fixed order, which is unambiguous (strings are quoted and escaped,
+# None is null) and, unlike packing each field from Python, runs in C
+mechanics_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def get_sorted_type_value_pairs(entries):
+    pairs = [
+        [entry.get('type'), entry.get('value')]
+        for entry in entries
+        if entry is not None and entry.get('type') is not None
+    ]
+    return sorted(pairs, key=lambda pair: (pair[0], pair[1] if pair[1] is not None else ''))
+
+
+def get_card_mechanics_encoding(card):
+    # Canonical encoding of the mechanics that determine game behavior, hashed so alternate arts can be swapped safely.
+    # Cards from set JSON have structured attacks, while promos may only have concatenated_attack_names,
+    # and both have to encode identically when the mechanics match
+    attacks = card.get('attacks') or []
+    abilities = card.get('abilities') or []
+
+    attack_names = sorted([
+        attack.get('name')
+        for attack in attacks
+        if attack is not None and attack.get('name') is not None
+    ])
+    if len(attack_names) == 0 and card.get('concatenated_attack_names') is not None:
+        attack_names = sorted([
+            attack_name
+            for attack_name in str(card.get('concatenated_attack_names')).split('_')
+            if attack_name != ''
+        ])
+
+    ability_names = sorted([
+        ability.get('name')
+        for ability in abilities
+        if ability is not None and ability.get('name') is not None
+    ])
+
+    return bytes([MECHANICS_HASH_VERSION]) + mechanics_encoder.encode([
+        get_processed_name(card.get('name')),
+        str(card.get('hp')) if card.get('hp') is not None else None,
+        ability_names,
+        attack_names,
+        sorted([str(cost) for cost in (card.get('retreatCost') or []) if cost is not None]),
+        sorted([str(card_type) for card_type in (card.get('types') or []) if card_type is not None]),
+        get_sorted_type_value_pairs(card.get('weaknesses') or []),
+        get_sorted_type_value_pairs(card.get('resistances') or []),
+        card.get('regulationMark') if card.get('regulationMark') is not None else card.get('regulation_mark'),
+    ]).encode('utf-8')
+
+
+def hash_card_mechanics_encoding(encoding):
+    # 128 bits is plenty to avoid collisions between a few thousand cards, and doesn't need to be cryptographic
+    return hashlib.blake2b(encoding, digest_size=16).hexdigest()
+
+
+def get_card_mechanics_hash(card):
+    return hash_card_mechanics_encoding(get_card_mechanics_encoding(card))
+
+
+def get_card_mechanics_hashes(cards):
+    # Reprints and alternate arts share an encoding, so each unique encoding is only hashed once
+    hashes_by_encoding = {}
+    hashes = []
+    for card in cards:
+        encoding = get_card_mechanics_encoding(card)
+        if encoding not in hashes_by_encoding:
+            hashes_by_encoding[encoding] = hash_card_mechanics_encoding(encoding)
+        hashes.append(hashes_by_encoding[encoding])
+    return hashes
@@ -0,0 +1,217 @@
+import math
+import re
+
+# Name normalization and other per card rules that don't need pandas, so they're cheap to import
+
+prefix_replacement_regex = re.compile(r"^((special delivery|radiant|origin forme|hisuian|galarian|alolan|paldean|teal mask|hearthflame mask|wellspring mask|cornerstone mask|bloodmoon|lance's|single strike|rapid strike|ice rider|shadow rider|flying|surfing|heat|mow|wash|fan|frost|white|mega) )*", re.IGNORECASE)
+postfix_replacement_regex = re.compile(r" (ex|X ex|Y ex|Z ex|v|vstar|vmax|v-union|sunny form|rainy form|snowy form|with grey felt hat)$", re.IGNORECASE)
+
+professors_research_named_regex = re.compile(r"professor's research \(.*\)$", re.IGNORECASE)
+boss_orders_named_regex = re.compile(r"^boss's orders \(.*\)$", re.IGNORECASE)
+basic_energy_regex = re.compile(r"^basic .* energy$", re.IGNORECASE)
+basic_energy_replacement_regex = re.compile(r"^basic ", re.IGNORECASE)
+sprite_url_replacement_regex = re.compile(r"(\'|\.|:)", re.IGNORECASE)
+
+
+owner_replacement_regex = re.compile(r"^((N|Iono|Lillie|Hop|Marnie|Steven|Arven|Misty|Ethan|Cynthia|Team Rocket|Erika|Larry)'s )*", re.IGNORECASE)
+
+
+def normalize_apostrophes_in_card_text(value):
+    if value is None:
+        return None
+    return value.replace("’", "'")
+
+# If the card is a pokemon, remove the owner name from the beginning
+# Leave in owner names for trainers
+# Note that the owner name is part of the card name for decklist purposes, so should not always be stripped out
+def get_maybe_trainer_removed_name(name, supertype):
+    name = normalize_apostrophes_in_card_text(name)
+    return re.sub(owner_replacement_regex, '', name) if supertype == 'Pokémon' else name
+
+
+# Does basic name processing, but does not remove prefix/postfixes that should be part of the core name
+def get_processed_name(name):
+    name = normalize_apostrophes_in_card_text(name)
+    if professors_research_named_regex.match(name):
+        return "Professor's Research"
+    if boss_orders_named_regex.match(name):
+        return "Boss's Orders"
+    if basic_energy_regex.match(name):
+        return re.sub(basic_energy_replacement_regex, "", name)
+    return name
+
+
+set_id_to_official_code_overrides = {
+  "swshp": "PR", # sword and shield promos
+  "svp": "SVP", # scarlet and violet promos
+  "sv1": "SVI",
+  "sv2": "PAL",
+  "sv3": "OBF",
+  "sv3pt5": "MEW",
+  "sv4": "PAR",
+  "sv4pt5": "PAF",
+  "sv5": "TEF",
+  "sv6": "TWM",
+  "sv6pt5": "SFA",
+  "sv7": "SCR",
+  "sv8": "SSP",
+  "sv8pt5": "PRE",
+  "sv9": "JTG",
+  "me1": "MEG",
+  "me2": "PFL",
+  "me2pt5": "ASC",
+  "me3": "POR",
+  "me4": "CRI",
+  "me5": "PBL",
+}
+
+BASIC_ENERGY_NAMES = [
+    "Grass Energy",
+    "Fire Energy",
+    "Water Energy",
+    "Lightning Energy",
+    "Psychic Energy",
+    "Fighting Energy",
+    "Darkness Energy",
+    "Metal Energy"
+]
+
+def convert_int_or_infinity(s):
+    try:
+        i = int(s)
+    except ValueError:
+        i = math.inf
+    return i
+
+
+def normalize_name_for_sprite_filename(value):
+    return (
+        value.lower()
+        .replace("’", "")
+        .replace("'", "")
+        .replace(" ", "-")
+        .replace("é", "e")
+        .replace("-♀", "-f")
+        .replace("-♂", "-m")
+        .replace("♀", "-f")
+        .replace("♂", "-m")
+    )
+
+
+def get_sprite_file_name(name_without_prefix_and_postfix):
+    return re.sub(
+        sprite_url_replacement_regex,
+        '',
+        normalize_name_for_sprite_filename(name_without_prefix_and_postfix)
+    ) + ".png"
+
+
+def compute_detection_keywords_for_name(target_name, all_names):
+    # Edge cases - to prevent false squawkabilly and scream tail detection
+    special_cases = ["billy & o'nare", "jumbo ice cream"]
+    if target_name.lower() in special_cases:
+        return [target_name]
+    
+    # always include "rocky" for "rocky fighting energy"
+    if target_name.lower() == "rocky fighting energy":
+        return ["Rocky", target_name]
+
+    # look at all possible prefixes and postfixes for target_name
+    # for each of these that are not a substring present within all_names, add them to the result list
+
+    result = []
+    target_name = target_name.strip()
+    words = target_name.split()
+    n = len(words)
+
+    # Remove exact matches to the target name
+    filtered_names = [name.strip() for name in all_names if name.strip() != target_name]
+
+    # Word-based prefixes
+    for i in range(1, n + 1):
+        prefix = ' '.join(words[:i])
+        if not any(prefix in name for name in filtered_names) and len(prefix) > 4:
+            result.append(prefix)
+
+    # Word-based postfixes
+    for i in range(n):
+        postfix = ' '.join(words[i:])
+        if not any(postfix in name for name in filtered_names) and len(postfix) > 4:
+            result.append(postfix)
+            
+    # Remove the word 'stadium' from the result if present, to prevent false positives
+    result = [keyword for keyword in result if keyword.lower() != 'stadium']
+
+    return result
+
+
+def get_rarity_for_mismatch_correction(card_id, rarity):
+    # TODO: Implement
+    if rarity != 'Promo':
+        return rarity # if not a promo, return the original rarity
+    
+    # If it's a promo, try to match it to an existing rarity so we can tell the user if
+    # they might be mis-scanning a card
+     
+    # Cards that look like double rares, but are promos
+    if card_id in [
+        "svp-28",
+        "svp-29",
+        "svp-33",
+        "svp-34",
+        "svp-25",
+        "svp-49",
+        "svp-50",
+        "svp-67",
+        "svp-68",
+        "svp-126",
+        "svp-127",
+        "svp-128",
+        "svp-144",
+        "svp-145",
+        "svp-146",
+        "svp-147",
+        "svp-160",
+        "svp-161",
+        "svp-177",
+        "svp-193",
+        "svp-196",
+        "svp-205",
+        "svp-216",
+        "svp-217",
+        "svp-218",
+        "mep-11",
+        "mep-12",
+        "mep-25",
+        "mep-29",
+        "mep-30",
+        "mep-34",
+        "mep-35",
+        "mep-36",
+    ]:
+        return 'Double Rare'
+    
+    # Cards that look like full arts, but are promos
+    if card_id in [
+        "svp-56",
+        "svp-74",
+        "svp-166",
+        "svp-194",
+        "svp-195",
+        "svp-204",
+    ]:
+        return 'Ultra Rare'
+    
+      # Cards that look like commons, but are promos
+    if card_id in [
+        "mep-7", # Psyduck
+    ]:
+        return 'Common'
+    
+    if card_id in [
+        "mep-8", # Golduck
+    ]:
+        return 'Uncommon'
+    
+   
+    return rarity
@@ -0,0 +1,196 @@
+import atexit
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from fetcher.config import get_settings
+
+# Requests go to the network, or are recorded to or replayed from an archive, depending on settings.http_mode
+
+# Archive path -> index, read once per archive
+http_archive_indexes = {}
+# Archive path -> open ZipFile. Each archive stays open for the whole run, so its central directory is only read
+# once when replaying, and only written once when recording (when the process exits, or close_http_archives is called)
+http_archives = {}
+# Images are downloaded from several threads at once, and ZipFile isn't thread safe
+http_archive_lock = threading.Lock()
+
+
+def get_http_archive_entry_name(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def get_http_archive(archive_path):
+    # Call with http_archive_lock held
+    if archive_path not in http_archives:
+        if get_settings().http_mode == 'record':
+            http_archives[archive_path] = zipfile.ZipFile(archive_path, 'a', compression=zipfile.ZIP_DEFLATED)
+        else:
+            http_archives[archive_path] = zipfile.ZipFile(archive_path)
+    return http_archives[archive_path]
+
+
+def close_http_archives():
+    with http_archive_lock:
+        for archive in http_archives.values():
+            archive.close()
+        http_archives.clear()
+
+
+# Responses are appended as they arrive, and the archive is closed on the way out (including after an error or
+# Ctrl-C), so an interrupted recording keeps what it has
+atexit.register(close_http_archives)
+
+
+def get_http_archive_index(archive_path):
+    # url -> {"url", "status", "entry_name"}, read from the metadata entries in the archive.
+    # Call with http_archive_lock held
+    if archive_path not in http_archive_indexes:
+        http_archive_index = {}
+        if os.path.isfile(archive_path) or get_settings().http_mode == 'record':
+            archive = get_http_archive(archive_path)
+            for entry_name in archive.namelist():
+                if entry_name.endswith('.json'):
+                    metadata = json.loads(archive.read(entry_name))
+                    http_archive_index[metadata['url']] = metadata
+        http_archive_indexes[archive_path] = http_archive_index
+    return http_archive_indexes[archive_path]
+
+
+def record_http_response(url, status, body):
+    archive_path = get_settings().http_archive_path
+    with http_archive_lock:
+        index = get_http_archive_index(archive_path)
+        if url in index:
+            return
+        metadata = {"url": url, "status": status, "entry_name": get_http_archive_entry_name(url)}
+        archive = get_http_archive(archive_path)
+        archive.writestr(metadata['entry_name'] + '.body', body)
+        archive.writestr(metadata['entry_name'] + '.json', json.dumps(metadata))
+        index[url] = metadata
+
+
+class MissingRecordedResponseError(LookupError):
+    # Replaying a URL that was never recorded. Not an OSError or ValueError, so downloads don't retry it
+    pass
+
+
+def replay_http_response(url):
+    archive_path = get_settings().http_archive_path
+    with http_archive_lock:
+        metadata = get_http_archive_index(archive_path).get(url)
+        if metadata is None:
+            raise MissingRecordedResponseError(f"No recorded response for {url} in {archive_path}")
+        if metadata['status'] != 200:
+            raise urllib.error.HTTPError(url, metadata['status'], 'Recorded error', None, None)
+        return io.BytesIO(get_http_archive(archive_path).read(metadata['entry_name'] + '.body'))
+
+
+def open_url(url):
+    http_mode = get_settings().http_mode
+    if http_mode == 'replay':
+        return replay_http_response(url)
+
+    request = urllib.request.Request(
+        url,
+        headers={"User-Agent": "script"}
+    )
+    if http_mode != 'record':
+        return urllib.request.urlopen(request, timeout=20)
+
+    try:
+        with urllib.request.urlopen(request, timeout=20) as response:
+            body = response.read()
+    except urllib.error.HTTPError as error:
+        # 404s are part of normal runs (sprite and species fallbacks), so they're replayed too
+        if error.code == 404:
+            record_http_response(url, error.code, b'')
+        raise
+    record_http_response(url, 200, body)
+    return io.BytesIO(body)
+
+
+def fetch_text_url(url):
+    with open_url(url) as response:
+        return response.read().decode('utf-8')
+
+
+DOWNLOAD_WORKERS = 16
+DOWNLOAD_ATTEMPTS = 4
+DOWNLOAD_BACKOFF_SECONDS = 1
+# Server errors and rate limiting are worth retrying, other HTTP errors (like 404s) aren't
+RETRYABLE_HTTP_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+def check_downloaded_file(destination_path, temp_path, expected_length):
+    if expected_length is not None and os.path.getsize(temp_path) != int(expected_length):
+        raise ValueError(f"Expected {expected_length} bytes but got {os.path.getsize(temp_path)}")
+    if destination_path.endswith('.png'):
+        # Checks the image is complete - Pillow raises SyntaxError or OSError if it isn't
+        # (some 'png' files are really jpgs, which Pillow handles too).
+        # Imported here so fetching JSON and pages doesn't need Pillow
+        from PIL import Image
+        with Image.open(temp_path) as img:
+            img.verify()
+
+
+def download_url_to_file(url, destination_path):
+    # Downloads to a temporary file that's only renamed into place once it's complete and valid,
+    # so an interrupted run never leaves a truncated file behind to be skipped on the next run.
+    # Returns the number of bytes downloaded
+    temp_path = destination_path + '.part'
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        try:
+            with open_url(url) as response, open(temp_path, 'wb') as output_file:
+                shutil.copyfileobj(response, output_file)
+                expected_length = response.headers.get('Content-Length') if hasattr(response, 'headers') else None
+            check_downloaded_file(destination_path, temp_path, expected_length)
+            downloaded_bytes = os.path.getsize(temp_path)
+            os.replace(temp_path, destination_path)
+            return downloaded_bytes
+        except (OSError, ValueError, SyntaxError) as error:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            retryable = not isinstance(error, urllib.error.HTTPError) or error.code in RETRYABLE_HTTP_STATUS_CODES
+            if not retryable or attempt == DOWNLOAD_ATTEMPTS:
+                raise
+            backoff_seconds = DOWNLOAD_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            print(f"Download of {url} failed ({error}), retrying in {backoff_seconds}s")
+            time.sleep(backoff_seconds)
+
+
+def download_urls_to_files(urls_and_paths):
+    # Downloads concurrently, and reports throughput once everything is done
+    if len(urls_and_paths) == 0:
+        return
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = [executor.submit(download_url_to_file, url, path) for url, path in urls_and_paths]
+        total_bytes = 0
+        for index, future in enumerate(futures, start=1):
+            total_bytes += future.result()
+            if index % 100 == 0 or index == len(futures):
+                print(f"Downloaded {index}/{len(futures)} files")
+    seconds = time.perf_counter() - start_time
+    print(
+        f"Downloaded {len(urls_and_paths)} files ({total_bytes / 1_000_000:.1f} MB) in {seconds:.1f}s: "
+        f"{len(urls_and_paths) / seconds:.1f} files/s, {total_bytes / 1_000_000 / seconds:.2f} MB/s"
+    )
+
+
+def try_download_url_to_file(url, destination_path):
+    try:
+        download_url_to_file(url, destination_path)
+        return True
+    except urllib.error.HTTPError as error:
+        if error.code == 404:
+            return False
+        raise
@@ -0,0 +1,426 @@
+import html
+import json
+import os
+import re
+import urllib.error
+import urllib.parse
+
+from fetcher.config import get_settings
+from fetcher.mechanics import get_card_mechanics_hash
+from fetcher.names import (
+    get_maybe_trainer_removed_name,
+    get_processed_name,
+    get_rarity_for_mismatch_correction,
+    postfix_replacement_regex,
+    prefix_replacement_regex,
+)
+from fetcher.network import fetch_text_url, open_url
+
+# Promo cards aren't in the set JSON, so they're parsed from their pkmncards.com pages
+
+PROMO_SET_CONFIG = {
+    "svp": {
+        "set_code": "SVP",
+        "set_name": "Scarlet & Violet Black Star Promos",
+        "set_slug": "scarlet-violet-promos",
+    },
+    "mep": {
+        "set_code": "MEP",
+        "set_name": "Mega Evolution Black Star Promos",
+        "set_slug": "mega-evolution-promos",
+    },
+}
+
+PROMO_TYPE_SYMBOL_TO_NAME = {
+    "G": "Grass",
+    "R": "Fire",
+    "W": "Water",
+    "L": "Lightning",
+    "P": "Psychic",
+    "F": "Fighting",
+    "D": "Darkness",
+    "M": "Metal",
+    "N": "Dragon",
+    "Y": "Fairy",
+    "C": "Colorless",
+}
+
+PROMO_SPECIES_LISTING_URL = "https://pokeapi.co/api/v2/pokemon-species/?limit=100000"
+pokeapi_species_url_id_regex = re.compile(r"/pokemon-species/(\d+)/?$")
+
+# Species numbers never change, so they're kept on disk between runs
+promo_species_number_cache = None
+promo_species_number_cache_seeded = False
+
+
+def get_regex_match_value(match):
+    if match.lastindex is None:
+        return match.group(0)
+    if match.lastindex == 1:
+        return match.group(1)
+    return match.groups()
+
+
+def search_first_regex_match(pattern, text, flags=0, default=None):
+    match = re.search(pattern, text, flags)
+    if match is None:
+        return default
+    return get_regex_match_value(match)
+
+
+html_line_break_regex = re.compile(r'<br\s*/?>', re.IGNORECASE)
+html_tag_regex = re.compile(r'<[^>]+>')
+whitespace_regex = re.compile(r'\s+')
+
+
+def html_to_normalized_text(value):
+    if value is None:
+        return None
+    value = html_line_break_regex.sub('\n', value)
+    value = html_tag_regex.sub('', value)
+    value = html.unescape(value)
+    return whitespace_regex.sub(' ', value).strip()
+
+
+def normalize_pokeapi_species_slug(slug):
+    normalized_slug = slug.lower()
+    normalized_slug = normalized_slug.replace("♀", "-f").replace("♂", "-m")
+    normalized_slug = normalized_slug.replace("’", "").replace("'", "")
+    return normalized_slug
+
+
+def get_pokeapi_species_slug_candidates(species_slug):
+    normalized_slug = normalize_pokeapi_species_slug(species_slug)
+    candidates = [normalized_slug]
+
+    generic_fallbacks = {
+        "nidoran-female": "nidoran-f",
+        "nidoran-male": "nidoran-m",
+        "mr-mime": "mr-mime",
+        "mime-jr": "mime-jr",
+        "type-null": "type-null",
+        "farfetchd": "farfetchd",
+    }
+    if normalized_slug in generic_fallbacks and generic_fallbacks[normalized_slug] not in candidates:
+        candidates.append(generic_fallbacks[normalized_slug])
+
+    return candidates
+
+
+def get_promo_species_number_cache():
+    global promo_species_number_cache
+    if promo_species_number_cache is None:
+        promo_species_number_cache = {}
+        if os.path.isfile(get_settings().promo_species_number_cache_path):
+            with open(get_settings().promo_species_number_cache_path) as f:
+                promo_species_number_cache = json.load(f)
+    return promo_species_number_cache
+
+
+def save_promo_species_number_cache():
+    with open(get_settings().promo_species_number_cache_path, 'w') as f:
+        json.dump(promo_species_number_cache, f, indent=2, sort_keys=True)
+
+
+def seed_promo_species_number_cache():
+    # A single listing call covers every species, instead of one call per slug
+    global promo_species_number_cache_seeded
+    promo_species_number_cache_seeded = True
+    print("Downloading PokeAPI species listing")
+    species_listing = json.load(open_url(PROMO_SPECIES_LISTING_URL))
+    cache = get_promo_species_number_cache()
+    for species in species_listing['results']:
+        species_id = search_first_regex_match(pokeapi_species_url_id_regex, species['url'])
+        if species_id is not None:
+            cache[species['name']] = [int(species_id)]
+    save_promo_species_number_cache()
+
+
+def get_national_pokedex_numbers_for_species_slug(species_slug):
+    cache = get_promo_species_number_cache()
+    candidate_slugs = get_pokeapi_species_slug_candidates(species_slug)
+    for candidate_slug in candidate_slugs:
+        if candidate_slug in cache:
+            return cache[candidate_slug]
+
+    if not promo_species_number_cache_seeded:
+        seed_promo_species_number_cache()
+        for candidate_slug in candidate_slugs:
+            if candidate_slug in cache:
+                return cache[candidate_slug]
+
+    for candidate_slug in candidate_slugs:
+        species_url = f"https://pokeapi.co/api/v2/pokemon-species/{urllib.parse.quote(candidate_slug)}/"
+        try:
+            species_data = json.load(open_url(species_url))
+            cache[candidate_slug] = [species_data['id']]
+            save_promo_species_number_cache()
+            return cache[candidate_slug]
+        except urllib.error.HTTPError as error:
+            if error.code != 404:
+                raise
+
+    raise ValueError(f"Could not resolve PokeAPI species slug for {species_slug}")
+
+
+def promo_set_printed_total_from_card_number(set_id, number):
+    return int(number)
+
+
+def parse_promo_retreat_cost(retreat_value):
+    if retreat_value is None or retreat_value == '0':
+        return []
+    try:
+        retreat_count = int(retreat_value)
+    except ValueError:
+        return []
+    return ['Colorless'] * retreat_count
+
+
+# Promo card pages are parsed by finding where each field starts with plain substring searches,
+# then matching precompiled patterns anchored at those positions. Every field pattern starts with
+# its anchor text, so this gives the same results as searching the whole page with each pattern,
+# without retrying the lazy DOTALL patterns from every position in the page
+PROMO_PAGE_ANCHORS = {
+    "title": '<h1 class="card-title"',
+    "type": '<span class="type"',
+    "hp": '<span class="hp"',
+    "color": '<span class="color"',
+    "type_evolves": '<div class="type-evolves-is">',
+    "text": '<div class="text">',
+    "weak": '<span class="weak"',
+    "resist": '<span class="resist"',
+    "retreat": '<span class="retreat"',
+    "mark": 'Mark:',
+    "pokemon": '<span class="pokemon"',
+}
+
+promo_title_regex = re.compile(r'<h1 class="card-title"[^>]*>([^<]+)</h1>')
+promo_title_name_and_number_regex = re.compile(r'^(.*?) · .*?#(\d+)$')
+promo_supertype_regex = re.compile(r'<span class="type"[^>]*>(.*?)</span>', re.DOTALL)
+promo_hp_regex = re.compile(r'<span class="hp"[^>]*>(?:<a [^>]*>)?(\d+)\s*HP(?:</a>)?</span>', re.DOTALL)
+promo_type_symbol_regex = re.compile(
+    r'<span class="color"[^>]*>.*?<abbr title="[^"]+" class="ptcg-font ptcg-symbol-name"><span class="vh">\{</span>([A-Z])',
+    re.DOTALL
+)
+promo_type_evolves_regex = re.compile(r'<div class="type-evolves-is">(.*?)</div>', re.DOTALL)
+promo_stage_regex = re.compile(r'<span class="stage"[^>]*>(.*?)</span>', re.DOTALL)
+promo_evolves_from_regex = re.compile(r'<span class="evolves">Evolves from (.*?)</span>', re.DOTALL)
+promo_trainer_subtype_regex = re.compile(r'<span class="sub-type"[^>]*>(.*?)</span>', re.DOTALL)
+promo_is_value_regex = re.compile(r'<span class="is"[^>]*>is:\s*(.*?)</span>', re.DOTALL)
+promo_text_section_regex = re.compile(
+    r'<div class="text">(.*?)</div>\s*(?:<div class="weak-resist-retreat">|<div class="rules minor-text">|<div class="mark-formats)',
+    re.DOTALL
+)
+promo_ability_name_regex = re.compile(r'Ability</a>\s*⇢\s*([^<]+)<br', re.DOTALL)
+promo_attack_name_regex = re.compile(r'→\s*<span>([^<]+)</span>', re.DOTALL)
+promo_weakness_regex = re.compile(
+    r'<span class="weak"[^>]*>weak:\s*.*?<abbr title="([^"]+)".*?<span title="Weakness Modifier">([^<]+)</span>',
+    re.DOTALL
+)
+PROMO_WEAKNESS_MODIFIER = '<span title="Weakness Modifier">'
+promo_resistance_section_regex = re.compile(r'<span class="resist"[^>]*>.*?</span>\s*\|\s*<span class="retreat"', re.DOTALL)
+promo_resistance_regex = re.compile(r'<abbr title="([^"]+)".*?<span title="Resistance Modifier">([^<]+)</span>', re.DOTALL)
+promo_retreat_regex = re.compile(r'<span class="retreat"[^>]*>retreat:\s*.*?<abbr title="[^"]*">(\d+)</abbr>', re.DOTALL)
+promo_regulation_mark_regex = re.compile(r'Mark:\s*<a [^>]*>([^<]+)</a>', re.DOTALL)
+promo_small_image_url_regex = re.compile(r'<a href="([^"]+)" class="card-image-link"')
+promo_species_regex = re.compile(r'<span class="pokemon"[^>]*><a href="https://pkmncards\.com/pokemon/([^"/]+)/"')
+promo_species_fallback_regex = re.compile(r'<span class="pokemon"[^>]*><a href="https://pkmncards\.com/pokemon/([^"/]+)/?"')
+
+
+def iter_anchor_positions(text, anchor):
+    position = text.find(anchor)
+    while position != -1:
+        yield position
+        position = text.find(anchor, position + 1)
+
+
+def match_first_at_anchors(pattern, text, anchor, default=None, endpos=None):
+    # Same result as search_first_regex_match for a pattern starting with the anchor text
+    for position in iter_anchor_positions(text, anchor):
+        match = pattern.match(text, position, len(text) if endpos is None else endpos)
+        if match is not None:
+            return get_regex_match_value(match)
+    return default
+
+
+def match_all_at_anchors(pattern, text, anchor):
+    # Same result as re.findall for a single group pattern starting with the anchor text
+    results = []
+    end = 0
+    for position in iter_anchor_positions(text, anchor):
+        if position < end:
+            continue
+        match = pattern.match(text, position)
+        if match is not None:
+            results.append(match.group(1))
+            end = match.end()
+    return results
+
+
+def get_weakness_value_end(card_html, modifier_position):
+    # Where a weakness match using the Weakness Modifier at modifier_position would end: after its value and closing tag
+    value_end = card_html.find('<', modifier_position + len(PROMO_WEAKNESS_MODIFIER))
+    return len(card_html) if value_end == -1 else value_end + len('</span>')
+
+
+def match_weakness(card_html):
+    # Same result as searching the whole page for the weakness, without letting the two lazy wildcards in the
+    # pattern scan the rest of the page when it doesn't match. A match ends at a Weakness Modifier, so on a normal
+    # page it's matched up to the first one after the anchor, and otherwise up to the last one on the page
+    weak_position = card_html.find(PROMO_PAGE_ANCHORS['weak'])
+    modifier_position = card_html.find(PROMO_WEAKNESS_MODIFIER, weak_position) if weak_position != -1 else -1
+    if modifier_position == -1:
+        return None, None
+    match = promo_weakness_regex.match(card_html, weak_position, get_weakness_value_end(card_html, modifier_position))
+    if match is not None:
+        return match.groups()
+    return match_first_at_anchors(
+        promo_weakness_regex,
+        card_html,
+        PROMO_PAGE_ANCHORS['weak'],
+        default=(None, None),
+        endpos=get_weakness_value_end(card_html, card_html.rfind(PROMO_WEAKNESS_MODIFIER))
+    )
+
+
+def parse_promo_card_page(card_html, set_id):
+    config = PROMO_SET_CONFIG[set_id]
+
+    title = match_first_at_anchors(promo_title_regex, card_html, PROMO_PAGE_ANCHORS['title'])
+    if title is None:
+        raise ValueError(f"Could not parse promo card title for set {set_id}")
+
+    card_name_raw, card_number = search_first_regex_match(
+        promo_title_name_and_number_regex,
+        html_to_normalized_text(title)
+    )
+
+    supertype = html_to_normalized_text(match_first_at_anchors(promo_supertype_regex, card_html, PROMO_PAGE_ANCHORS['type']))
+
+    hp = match_first_at_anchors(promo_hp_regex, card_html, PROMO_PAGE_ANCHORS['hp'])
+
+    type_symbols = match_all_at_anchors(promo_type_symbol_regex, card_html, PROMO_PAGE_ANCHORS['color'])
+    types = [PROMO_TYPE_SYMBOL_TO_NAME[symbol] for symbol in type_symbols if symbol in PROMO_TYPE_SYMBOL_TO_NAME]
+
+    type_evolves_html = match_first_at_anchors(promo_type_evolves_regex, card_html, PROMO_PAGE_ANCHORS['type_evolves'], default='')
+    stage = html_to_normalized_text(search_first_regex_match(promo_stage_regex, type_evolves_html))
+    evolves_from = html_to_normalized_text(search_first_regex_match(promo_evolves_from_regex, type_evolves_html))
+    trainer_subtype = html_to_normalized_text(search_first_regex_match(promo_trainer_subtype_regex, type_evolves_html))
+    is_value = html_to_normalized_text(search_first_regex_match(promo_is_value_regex, type_evolves_html))
+
+    subtypes = []
+    if supertype == 'Pokémon':
+        subtypes = [stage] if stage is not None else []
+        if is_value is not None:
+            if 'ex' in is_value.lower():
+                subtypes.append('ex')
+            if 'tera' in is_value.lower():
+                subtypes.append('Tera')
+    elif trainer_subtype is not None:
+        subtypes = [trainer_subtype]
+
+    text_section = match_first_at_anchors(promo_text_section_regex, card_html, PROMO_PAGE_ANCHORS['text'], default='')
+    ability_names = [
+        html_to_normalized_text(match)
+        for match in promo_ability_name_regex.findall(text_section)
+    ]
+    attack_names = [
+        html_to_normalized_text(match)
+        for match in promo_attack_name_regex.findall(text_section)
+    ]
+
+    weakness_type = weakness_value = resistance_type = resistance_value = None
+    retreat_value = '0'
+    if supertype == 'Pokémon':
+        weakness_type, weakness_value = match_weakness(card_html)
+        resistance_section = match_first_at_anchors(promo_resistance_section_regex, card_html, PROMO_PAGE_ANCHORS['resist'], default='')
+        if 'No Resistance' not in resistance_section:
+            resistance_type, resistance_value = search_first_regex_match(
+                promo_resistance_regex,
+                resistance_section,
+                default=(None, None)
+            )
+        retreat_value = match_first_at_anchors(promo_retreat_regex, card_html, PROMO_PAGE_ANCHORS['retreat'], default='0')
+    regulation_mark = html_to_normalized_text(match_first_at_anchors(promo_regulation_mark_regex, card_html, PROMO_PAGE_ANCHORS['mark']))
+    small_image_url = search_first_regex_match(promo_small_image_url_regex, card_html)
+    species_href = None
+    if supertype == 'Pokémon':
+        species_href = match_first_at_anchors(promo_species_regex, card_html, PROMO_PAGE_ANCHORS['pokemon'])
+        if species_href is None:
+            species_href = match_first_at_anchors(promo_species_fallback_regex, card_html, PROMO_PAGE_ANCHORS['pokemon'])
+        if species_href is None:
+            raise ValueError(f"Could not parse species slug for promo card {title}")
+
+    card = {
+        "id": f"{set_id}-{int(card_number)}",
+        "name": get_processed_name(card_name_raw),
+        "name_without_prefix": re.sub(
+            prefix_replacement_regex,
+            '',
+            get_maybe_trainer_removed_name(get_processed_name(card_name_raw), supertype)
+        ),
+        "name_without_prefix_and_postfix": re.sub(
+            prefix_replacement_regex,
+            '',
+            re.sub(
+                postfix_replacement_regex,
+                '',
+                get_maybe_trainer_removed_name(get_processed_name(card_name_raw), supertype)
+            )
+        ),
+        "supertype": supertype,
+        "subtypes": subtypes,
+        "rarity": "Promo",
+        "rarity_for_mismatch_correction": get_rarity_for_mismatch_correction(f"{set_id}-{int(card_number)}", "Promo"),
+        "hp": hp,
+        "set_id": set_id,
+        "set_code": config['set_code'],
+        "regulation_mark": regulation_mark,
+        "set_name": config['set_name'],
+        "number": str(int(card_number)),
+        "set_printed_total": promo_set_printed_total_from_card_number(set_id, card_number),
+        "small_image_url": small_image_url,
+        "types": types if len(types) > 0 else None,
+        "national_pokedex_numbers": get_national_pokedex_numbers_for_species_slug(species_href) if species_href is not None else None,
+        "evolves_from": get_processed_name(evolves_from) if evolves_from is not None and supertype == 'Pokémon' else None,
+        "concatenated_attack_names": '_'.join(attack_names) if len(attack_names) > 0 and supertype == 'Pokémon' else None,
+        "abilities": [{'name': ability_name} for ability_name in ability_names],
+        "attacks": [{'name': attack_name} for attack_name in attack_names],
+        "weaknesses": [{'type': weakness_type, 'value': weakness_value}] if weakness_type is not None else [],
+        "resistances": [{'type': resistance_type, 'value': resistance_value}] if resistance_type is not None else [],
+        "retreatCost": parse_promo_retreat_cost(retreat_value),
+    }
+    card["cardMechanicsHash"] = get_card_mechanics_hash(card) if supertype == 'Pokémon' else None
+    return card
+
+
+def fetch_promo_cards(existing_card_ids=None):
+    # Returns a card dict for each promo
+    promo_cards = []
+
+    for set_id, config in PROMO_SET_CONFIG.items():
+        set_url = f"https://pkmncards.com/set/{config['set_slug']}/?display=text"
+        set_html = fetch_text_url(set_url)
+        set_entries = re.findall(
+            r'<a href="(https://pkmncards\.com/card/[^"]+/)" class="card-link" title="[^"]+\(' + config['set_code'] + r'\) #(\d+)"',
+            set_html
+        )
+        print(f"Found {len(set_entries)} entries for {set_id}")
+
+        selected_entries = []
+        for card_url, card_number in set_entries:
+            print(f"Processing {card_url} for {set_id}")
+            card_id = f"{set_id}-{int(card_number)}"
+            if existing_card_ids is not None and card_id in existing_card_ids:
+                continue
+            selected_entries.append((card_url, card_number))
+
+        for index, (card_url, card_number) in enumerate(selected_entries, start=1):
+            print(f"Downloading promo card {index}/{len(selected_entries)}: {card_url}")
+            card_html = fetch_text_url(card_url)
+            parsed_card = parse_promo_card_page(card_html, set_id)
+            if parsed_card is not None:
+                promo_cards.append(parsed_card)
+
+    return promo_cards
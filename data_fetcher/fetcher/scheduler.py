@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# Runs a build as a graph of stages. Each stage declares the values it reads and the values it produces, and
+# runs as soon as everything it reads is ready - on a thread, limited by a separate budget for each kind of
+# resource, so network bound stages overlap with CPU bound ones instead of waiting for them.
+# Cacheable stages are skipped when their inputs have the same fingerprint as on the last run (and every file
+# they wrote is still there), reusing the outputs saved to the cache directory. Outputs of cacheable stages
+# must be JSON serializable. Fingerprints only cover inputs, so bump a stage's version when its code changes
+
+# Bump this to invalidate every cached stage at once
+SCHEDULER_CACHE_VERSION = 1
+
+
+@dataclass
+class Stage:
+    name: str
+    # 'network' or 'cpu', which decides the budget the stage counts against
+    resource: str
+    # Takes {input name: value} and returns {output name: value}
+    run: callable
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    cacheable: bool = False
+    version: int = 1
+    # Output listing the files the stage writes, which all have to exist for a cached result to be reused
+    written_paths_output: str = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    resource: str
+    skipped: bool
+    # Seconds since the build started
+    started: float
+    finished: float
+
+    @property
+    def seconds(self):
+        return self.finished - self.started
+
+
+def get_fingerprint(value):
+    # Dataframes are fingerprinted by their columns, everything else by its JSON.
+    # Values that can't be encoded (like numpy integers) fall back to str
+    if hasattr(value, 'columns') and hasattr(value, 'to_dict'):
+        value = {"columns": list(value.columns), "data": value.to_dict(orient='list')}
+    encoded = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def check_stages(stages):
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is produced by both {producers[output]} and {stage.name}")
+            producers[output] = stage.name
+    for stage in stages:
+        for stage_input in stage.inputs:
+            if stage_input not in producers:
+                raise ValueError(f"Nothing produces {stage_input}, which {stage.name} needs")
+        if stage.written_paths_output is not None and stage.written_paths_output not in stage.outputs:
+            raise ValueError(f"{stage.name} lists its written paths in {stage.written_paths_output}, which it doesn't produce")
+
+
+class StageCache:
+    def __init__(self, directory, salt):
+        # salt is mixed into every fingerprint, for anything that changes what stages write (like output paths)
+        self.directory = directory
+        self.salt = salt
+        self.fingerprints = {}
+        self.lock = threading.Lock()
+
+    def get_value_fingerprint(self, name, value):
+        # Values are shared by every stage that reads them, so each is only fingerprinted once
+        with self.lock:
+            if name not in self.fingerprints:
+                self.fingerprints[name] = get_fingerprint(value)
+            return self.fingerprints[name]
+
+    def get_stage_fingerprint(self, stage, stage_inputs):
+        return get_fingerprint({
+            "version": [SCHEDULER_CACHE_VERSION, stage.version],
+            "salt": self.salt,
+            "inputs": {name: self.get_value_fingerprint(name, value) for name, value in stage_inputs.items()},
+        })
+
+    def get_path(self, stage):
+        return self.directory + '/' + stage.name + '.json'
+
+    def load(self, stage, fingerprint):
+        # The saved outputs, or None if the stage has to run
+        if not os.path.isfile(self.get_path(stage)):
+            return None
+        with open(self.get_path(stage)) as f:
+            entry = json.load(f)
+        if entry["fingerprint"] != fingerprint:
+            return None
+        outputs = entry["outputs"]
+        if stage.written_paths_output is not None and not all(os.path.isfile(path) for path in outputs[stage.written_paths_output]):
+            return None
+        return outputs
+
+    def save(self, stage, fingerprint, outputs):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        with open(self.get_path(stage) + '.part', 'w') as f:
+            json.dump({"fingerprint": fingerprint, "outputs": outputs}, f)
+        os.replace(self.get_path(stage) + '.part', self.get_path(stage))
+
+
+def run_stage(stage, stage_inputs, cache, start_time):
+    started = time.perf_counter() - start_time
+    fingerprint = outputs = None
+    if stage.cacheable and cache is not None:
+        fingerprint = cache.get_stage_fingerprint(stage, stage_inputs)
+        outputs = cache.load(stage, fingerprint)
+    skipped = outputs is not None
+    if not skipped:
+        outputs = stage.run(stage_inputs)
+        if set(outputs.keys()) != set(stage.outputs):
+            raise ValueError(f"{stage.name} produced {sorted(outputs.keys())}, but declares {sorted(stage.outputs)}")
+        if fingerprint is not None:
+            cache.save(stage, fingerprint, outputs)
+    return outputs, StageResult(stage.name, stage.resource, skipped, started, time.perf_counter() - start_time)
+
+
+def run_stages(stages, budgets, cache=None):
+    # budgets is {resource: number of stages using it at once}. Stages that are ready at the same time start
+    # in the order they're listed. Returns ({output name: value}, [StageResult] in order of finishing)
+    check_stages(stages)
+    assert all(budget >= 1 for budget in budgets.values()), f"Every resource needs a budget of at least 1: {budgets}"
+    start_time = time.perf_counter()
+    values = {}
+    results = []
+    pending = list(stages)
+    running = {}
+    in_use = {resource: 0 for resource in budgets}
+    error = None
+    with ThreadPoolExecutor(max_workers=sum(budgets.values())) as executor:
+        while (pending and error is None) or running:
+            if error is None:
+                for stage in list(pending):
+                    if all(name in values for name in stage.inputs) and in_use[stage.resource] < budgets[stage.resource]:
+                        pending.remove(stage)
+                        in_use[stage.resource] += 1
+                        stage_inputs = {name: values[name] for name in stage.inputs}
+                        running[executor.submit(run_stage, stage, stage_inputs, cache, start_time)] = stage
+                if not running:
+                    raise ValueError(f"Stages {[stage.name for stage in pending]} can never run - their inputs form a cycle")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                in_use[stage.resource] -= 1
+                try:
+                    outputs, result = future.result()
+                except Exception as stage_error:
+                    # Stages that are already running are left to finish, but nothing new starts
+                    error = error or stage_error
+                    continue
+                values.update(outputs)
+                results.append(result)
+                print(f"Stage {stage.name} {'skipped, inputs unchanged' if result.skipped else 'finished'} in {result.seconds:.2f}s")
+    if error is not None:
+        raise error
+    return values, results
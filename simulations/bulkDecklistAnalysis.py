@@ -0,0 +1,181 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from deckProbabilities import (
+    CARD_DATABASE_PATH,
+    compute_deck_probabilities,
+    get_card_group_key,
+    get_decklist_card_lookup,
+    group_decklist_cards,
+    load_card_database,
+    parse_exported_decklist,
+)
+
+# Card frequencies, prize risk and scanning ambiguities across many decklists at once, e.g. every list from an event.
+# Decklists are read from a text file in the format exported by the client, one after another - each one starts
+# at its 'Pokémon:' line, and an optional '# label' line before it names it (otherwise they're numbered)
+
+# Decklists are handed to the worker processes a batch at a time, so the input never has to fit in memory
+BATCH_SIZE_PER_WORKER = 16
+
+# Set in each worker process by init_worker, so the database is only loaded and indexed once per process
+worker_card_database = None
+worker_card_lookup = None
+
+
+def iter_decklists(path):
+    # Yields (label, decklist text) without reading the whole file
+    label = None
+    lines = []
+    count = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stripped_line = line.strip()
+            if stripped_line.startswith('Pokémon:') or stripped_line.startswith('#'):
+                if any(line.strip() for line in lines):
+                    count += 1
+                    yield label or f"Decklist {count}", ''.join(lines)
+                    label = None
+                    lines = []
+                if stripped_line.startswith('#'):
+                    label = stripped_line.lstrip('#').strip()
+                    continue
+            lines.append(line)
+    if any(line.strip() for line in lines):
+        yield label or f"Decklist {count + 1}", ''.join(lines)
+
+
+def init_worker(card_database_path):
+    global worker_card_database, worker_card_lookup
+    worker_card_database = load_card_database(card_database_path)
+    worker_card_lookup = get_decklist_card_lookup(worker_card_database)
+
+
+def analyze_decklist(label, decklist_text):
+    # Everything returned here is small, so sending it back to the main process is cheap
+    try:
+        decklist = parse_exported_decklist(decklist_text, worker_card_database, worker_card_lookup)
+        card_probabilities = compute_deck_probabilities(decklist)
+    except (ValueError, AssertionError) as error:
+        return {"label": label, "error": str(error)}
+
+    grouped_cards = group_decklist_cards(decklist)
+    return {
+        "label": label,
+        "cards": [
+            {
+                "key": get_card_group_key(card),
+                "name": card['name'],
+                "id": card['id'],
+                "count": count,
+                "prized_at_least_one": 1 - probabilities.prized_distribution[0],
+                "in_first_8_at_least_one": 1 - probabilities.first_8_distribution[0],
+            } for (card, count), probabilities in zip(grouped_cards, card_probabilities)
+        ],
+        # Printings that can be mistaken for mechanically identical ones when scanning
+        "ambiguous_card_ids": sorted(
+            card['id'] for card, count in decklist if len(card.get('similar_card_ids') or []) > 0
+        ),
+    }
+
+
+def analyze_decklists(decklists, card_database_path=CARD_DATABASE_PATH, workers=None):
+    decklists = iter(decklists)
+    workers = workers or os.cpu_count()
+    batch_size = BATCH_SIZE_PER_WORKER * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(card_database_path,)) as executor:
+        while True:
+            batch = list(itertools.islice(decklists, batch_size))
+            if len(batch) == 0:
+                return
+            yield from executor.map(analyze_decklist, *zip(*batch), chunksize=BATCH_SIZE_PER_WORKER)
+
+
+def aggregate_results(results):
+    decklist_count = 0
+    errors = []
+    cards = {}
+    ambiguous_card_ids = {}
+    for result in results:
+        if "error" in result:
+            errors.append({"label": result["label"], "error": result["error"]})
+            continue
+        decklist_count += 1
+        for card in result["cards"]:
+            totals = cards.setdefault(card["key"], {
+                "name": card["name"],
+                "id": card["id"],
+                "decklists": 0,
+                "copies": 0,
+                "prized_at_least_one": 0,
+                "in_first_8_at_least_one": 0,
+            })
+            totals["decklists"] += 1
+            totals["copies"] += card["count"]
+            totals["prized_at_least_one"] += card["prized_at_least_one"]
+            totals["in_first_8_at_least_one"] += card["in_first_8_at_least_one"]
+        for card_id in result["ambiguous_card_ids"]:
+            ambiguous_card_ids[card_id] = ambiguous_card_ids.get(card_id, 0) + 1
+
+    card_frequencies = []
+    for totals in cards.values():
+        card_frequencies.append({
+            "name": totals["name"],
+            "id": totals["id"],
+            "decklists": totals["decklists"],
+            "play_rate": totals["decklists"] / decklist_count,
+            "average_copies": totals["copies"] / totals["decklists"],
+            # Averaged over the decklists that play the card
+            "average_prized_at_least_one": totals["prized_at_least_one"] / totals["decklists"],
+            "average_in_first_8_at_least_one": totals["in_first_8_at_least_one"] / totals["decklists"],
+        })
+    card_frequencies.sort(key=lambda card: (-card["decklists"], card["name"]))
+
+    return {
+        "decklists": decklist_count,
+        "errors": errors,
+        "cards": card_frequencies,
+        "ambiguous_card_ids": dict(sorted(ambiguous_card_ids.items(), key=lambda item: (-item[1], item[0]))),
+    }
+
+
+def format_percentage(probability):
+    return f"{probability * 100:.2f}%"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Aggregate card frequencies and probabilities over many exported decklists')
+    parser.add_argument('decklists', help='Path to a file of decklists exported from the client, one after another')
+    parser.add_argument('--card-database', default=CARD_DATABASE_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help='Path to write the aggregated results to as JSON')
+    parser.add_argument('--top', type=int, default=30, help='Number of cards to print')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    summary = aggregate_results(analyze_decklists(iter_decklists(args.decklists), args.card_database, args.workers))
+    seconds = time.perf_counter() - start_time
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    total = summary["decklists"] + len(summary["errors"])
+    print(f"Analyzed {summary['decklists']} decklists in {seconds:.1f}s ({total / seconds:.1f} decklists/s)")
+    if len(summary["errors"]) > 0:
+        print(f"Skipped {len(summary['errors'])} decklists that couldn't be analyzed")
+    for error in summary["errors"][:args.top]:
+        print(f"Skipped {error['label']}: {error['error']}")
+    for card in summary["cards"][:args.top]:
+        print(
+            f"{card['name']} ({card['id']}): in {format_percentage(card['play_rate'])} of decklists, "
+            f"{card['average_copies']:.2f} copies, "
+            f"{format_percentage(card['average_prized_at_least_one'])} at least one prized, "
+            f"{format_percentage(card['average_in_first_8_at_least_one'])} at least one in first 8"
+        )
+    for card_id, count in list(summary["ambiguous_card_ids"].items())[:args.top]:
+        print(f"{card_id} has mechanically identical printings that can be mis-scanned, in {count} decklists")
@@ -0,0 +1,105 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+# Read only, memory mapped view of the card database written by fetch_data.py (write_card_store in fetcher/export.py).
+# Opening it doesn't parse anything, and pages are shared between processes that open the same files.
+# Layout of the store directory:
+# - schema.json: {"version", "build_id", "mechanics_hash_version", "rows", "heap_size", "columns": {name: kind}},
+#   kind is one of 'int', 'float', 'bool', 'string' or 'json' (lists and dicts, stored as JSON text)
+# - cards-{build_id}.npy: one structured array record per card. 'string' and 'json' columns are
+#   (offset, length) pairs into the heap, with a length of -1 for missing values
+# - heap-{build_id}.bin: the UTF-8 bytes of every string
+# - id_order-{build_id}.npy: row indexes sorted by card id, for looking cards up by id
+# Data files are only read through the build id in the schema, which is written last, so a store opened while
+# fetch_data.py is writing a new one is always entirely the old one or entirely the new one
+
+CARD_STORE_PATH = './../data_fetcher/data/card_store'
+CARD_STORE_VERSION = 2
+
+HEAP_KINDS = ['string', 'json']
+
+
+class CardStore:
+    def __init__(self, path=CARD_STORE_PATH):
+        with open(path + '/schema.json') as f:
+            self.schema = json.load(f)
+        assert self.schema['version'] == CARD_STORE_VERSION, \
+            f"Card store version {self.schema['version']} isn't supported, rerun fetch_data.py"
+        self.columns = self.schema['columns']
+        build_id = self.schema['build_id']
+        self.records = np.load(f"{path}/cards-{build_id}.npy", mmap_mode='r')
+        self.id_order = np.load(f"{path}/id_order-{build_id}.npy", mmap_mode='r')
+        # np.memmap can't map an empty file
+        self.heap = np.memmap(f"{path}/heap-{build_id}.bin", dtype=np.uint8, mode='r') if self.schema['heap_size'] > 0 \
+            else np.zeros(0, dtype=np.uint8)
+        assert len(self.records) == len(self.id_order) == self.schema['rows'] and len(self.heap) == self.schema['heap_size'], \
+            "Card store is incomplete, rerun fetch_data.py"
+
+    def __len__(self):
+        return len(self.records)
+
+    def get_column(self, column):
+        # Numeric columns are returned as a memory mapped array without copying.
+        # String and JSON columns have to be decoded, so prefer get_value for a few rows
+        if self.columns[column] not in HEAP_KINDS:
+            return self.records[column]
+        return [self.get_value(column, index) for index in range(len(self))]
+
+    def get_value(self, column, index):
+        kind = self.columns[column]
+        value = self.records[index][column]
+        if kind in HEAP_KINDS:
+            offset, length = int(value['offset']), int(value['length'])
+            if length < 0:
+                return None
+            text = self.heap[offset:offset + length].tobytes().decode('utf-8')
+            return json.loads(text) if kind == 'json' else text
+        if kind == 'float':
+            return None if np.isnan(value) else float(value)
+        return bool(value) if kind == 'bool' else int(value)
+
+    def find(self, card_id):
+        # Returns the row index for the card id, or None - a binary search, so nothing is indexed up front
+        low, high = 0, len(self.id_order)
+        while low < high:
+            middle = (low + high) // 2
+            middle_id = self.get_value('id', int(self.id_order[middle]))
+            if middle_id < card_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.id_order) and self.get_value('id', int(self.id_order[low])) == card_id:
+            return int(self.id_order[low])
+        return None
+
+    def get_card(self, card_id):
+        # The card as a dict, like an entry of card_database.json
+        index = self.find(card_id)
+        if index is None:
+            return None
+        return {column: self.get_value(column, index) for column in self.columns}
+
+
+# We only use this to sanity check the store - not part of main codebase
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare opening the card store with loading card_database.json')
+    parser.add_argument('--card-store', default=CARD_STORE_PATH)
+    parser.add_argument('--card-database', default='./../client/public/card_database.json')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    store = CardStore(args.card_store)
+    store_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with open(args.card_database) as f:
+        card_database = json.load(f)
+    json_seconds = time.perf_counter() - start_time
+
+    print(f"Opened card store with {len(store)} cards in {store_seconds * 1000:.2f}ms")
+    print(f"Loaded card_database.json with {len(card_database)} cards in {json_seconds * 1000:.2f}ms")
+    mismatched_ids = [card_id for card_id in card_database if store.find(card_id) is None]
+    print(f"{len(mismatched_ids)} card ids missing from the store")
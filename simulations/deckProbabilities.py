@@ -0,0 +1,227 @@
+import argparse
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from math import comb
+
+from openingStatistics import DECK_SIZE, HAND_SIZE, PRIZE_SIZE, hypergeometric_table
+
+# Prize and first 8 card probabilities for every card in a real decklist,
+# in the text format exported by the client (and TCG Live)
+
+CARD_DATABASE_PATH = './../client/public/card_database.json'
+
+# Reverse of TCG_LIVE_SET_OVERRIDE in the client
+TCG_LIVE_REVERSE_SET_OVERRIDE = {
+    'PR-SV': 'SVP',
+    'PR-SW': 'PR',
+    'Energy': 'sve',
+}
+
+decklist_row_regex = re.compile(r"^(\d+) (.+) ([A-Za-z-]+) ([a-zA-Z0-9]+)$")
+gallery_number_regex = re.compile(r"(?<=gg)0*", re.IGNORECASE)
+
+
+@dataclass
+class CardProbabilities:
+    name: str
+    card_id: str
+    count: int
+    is_basic: bool
+    # index = number of copies
+    prized_distribution: list = field(default_factory=list)
+    first_8_distribution: list = field(default_factory=list)
+
+
+def load_card_database(path=CARD_DATABASE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def is_basic_pokemon(card):
+    return card.get('supertype') == 'Pokémon' and 'Basic' in (card.get('subtypes') or [])
+
+
+def normalize_card_number(number):
+    return re.sub(gallery_number_regex, '', str(number)).replace('SWSH', '')
+
+
+def get_decklist_card_lookup(card_database):
+    # (pokemon by (set code, number), other cards by name) - build once when parsing many decklists
+    pokemon_by_set_and_number = {}
+    cards_by_name = {}
+    for card in card_database.values():
+        if card.get('supertype') == 'Pokémon':
+            pokemon_by_set_and_number.setdefault(
+                (card.get('set_code'), normalize_card_number(card.get('number'))), card
+            )
+        else:
+            cards_by_name.setdefault(card.get('name'), card)
+    return pokemon_by_set_and_number, cards_by_name
+
+
+def parse_exported_decklist(decklist_text, card_database, card_lookup=None):
+    # Returns (card, count) pairs, combining rows that resolve to the same card id
+    pokemon_by_set_and_number, cards_by_name = card_lookup or get_decklist_card_lookup(card_database)
+
+    counts_by_id = {}
+    for row in decklist_text.splitlines():
+        # remove ' PH' suffix if it exists - tcg live sometimes adds this for certain holo patterns
+        match = decklist_row_regex.match(re.sub(r" PH$", '', row.strip()))
+        if match is None:
+            continue
+        count, name, set_code, number = match.groups()
+        set_code = TCG_LIVE_REVERSE_SET_OVERRIDE.get(set_code, set_code)
+        card = pokemon_by_set_and_number.get((set_code, normalize_card_number(number)))
+        if card is None or card.get('name') != name:
+            card = cards_by_name.get(name)
+        if card is None:
+            raise ValueError(f"Could not find card for decklist row: {row}")
+        counts_by_id[card['id']] = counts_by_id.get(card['id'], 0) + int(count)
+
+    return [(card_database[card_id], count) for card_id, count in counts_by_id.items()]
+
+
+def get_card_group_key(card):
+    # Different printings of the same card are the same card as far as draws are concerned
+    if card.get('equivalence_class_id') is not None:
+        return card['equivalence_class_id']
+    return card.get('cardMechanicsHash') or card.get('name')
+
+
+def group_decklist_cards(decklist):
+    groups = {}
+    for card, count in decklist:
+        key = get_card_group_key(card)
+        if key in groups:
+            groups[key][1] += count
+        else:
+            groups[key] = [card, count]
+    return [tuple(group) for group in groups.values()]
+
+
+@lru_cache(maxsize=None)
+def valid_hand_target_distribution(target_copies, target_is_basic, basic_count, deck_size=DECK_SIZE):
+    # Number of target copies in the kept opening hand (mulligans redraw until there's a Basic)
+    valid_hands = comb(deck_size, HAND_SIZE) - comb(deck_size - basic_count, HAND_SIZE)
+    other_basics = basic_count - target_copies if target_is_basic else basic_count
+    distribution = []
+    for in_hand in range(min(target_copies, HAND_SIZE) + 1):
+        hands = comb(deck_size - target_copies, HAND_SIZE - in_hand)
+        if not (target_is_basic and in_hand > 0):
+            # No Basic among the target copies in hand, so one of the others must be there
+            hands -= comb(deck_size - target_copies - other_basics, HAND_SIZE - in_hand)
+        distribution.append(comb(target_copies, in_hand) * hands / valid_hands)
+    return tuple(distribution)
+
+
+@lru_cache(maxsize=None)
+def prized_distribution(target_copies, target_is_basic, basic_count, deck_size=DECK_SIZE):
+    remaining_after_hand = deck_size - HAND_SIZE
+    distribution = [0] * (min(target_copies, PRIZE_SIZE) + 1)
+    for in_hand, p_hand in enumerate(valid_hand_target_distribution(target_copies, target_is_basic, basic_count, deck_size)):
+        prize_table = hypergeometric_table(remaining_after_hand, target_copies - in_hand, PRIZE_SIZE)
+        for prized, p_prized in enumerate(prize_table):
+            distribution[prized] += p_hand * p_prized
+    return tuple(distribution)
+
+
+@lru_cache(maxsize=None)
+def first_8_distribution(target_copies, target_is_basic, basic_count, deck_size=DECK_SIZE):
+    remaining_after_hand = deck_size - HAND_SIZE
+    hand_distribution = valid_hand_target_distribution(target_copies, target_is_basic, basic_count, deck_size)
+    distribution = [0] * (min(target_copies, HAND_SIZE + 1) + 1)
+    for in_hand, p_hand in enumerate(hand_distribution):
+        p_hit = (target_copies - in_hand) / remaining_after_hand
+        distribution[in_hand] += p_hand * (1 - p_hit)
+        if in_hand < target_copies:
+            distribution[in_hand + 1] += p_hand * p_hit
+    return tuple(distribution)
+
+
+def compute_deck_probabilities(decklist):
+    # Every card with the same copy count and Basic-ness shares the same cached table
+    grouped_cards = group_decklist_cards(decklist)
+    basic_count = sum(count for card, count in grouped_cards if is_basic_pokemon(card))
+    assert sum(count for card, count in grouped_cards) == DECK_SIZE, "Decklist must have 60 cards"
+    assert basic_count > 0, "Decklist must have at least one Basic Pokémon"
+
+    return [
+        CardProbabilities(
+            name=card['name'],
+            card_id=card['id'],
+            count=count,
+            is_basic=is_basic_pokemon(card),
+            prized_distribution=list(prized_distribution(count, is_basic_pokemon(card), basic_count)),
+            first_8_distribution=list(first_8_distribution(count, is_basic_pokemon(card), basic_count)),
+        ) for card, count in grouped_cards
+    ]
+
+
+def simulate_deck_probabilities(decklist, trials=1_000_000, seed=None):
+    # Monte carlo version of compute_deck_probabilities - one shuffle per trial serves every card
+    grouped_cards = group_decklist_cards(decklist)
+    deck = []
+    for card_index, (card, count) in enumerate(grouped_cards):
+        deck += [card_index] * count
+    assert len(deck) == DECK_SIZE, "Decklist must have 60 cards"
+    is_basic = [is_basic_pokemon(card) for card, count in grouped_cards]
+    assert any(is_basic), "Decklist must have at least one Basic Pokémon"
+
+    rng = random.Random(seed)
+    prized_counts = [[0] * (min(count, PRIZE_SIZE) + 1) for card, count in grouped_cards]
+    first_8_counts = [[0] * (min(count, HAND_SIZE + 1) + 1) for card, count in grouped_cards]
+
+    for _ in range(trials):
+        # Mulligan until opening hand has ≥1 Basic
+        while True:
+            rng.shuffle(deck)
+            if any(is_basic[card_index] for card_index in deck[:HAND_SIZE]):
+                break
+        remaining_deck = deck[HAND_SIZE:]
+        prizes = rng.sample(remaining_deck, PRIZE_SIZE)
+        first_8 = deck[:HAND_SIZE + 1]
+
+        for card_index in range(len(grouped_cards)):
+            prized_counts[card_index][prizes.count(card_index)] += 1
+            first_8_counts[card_index][first_8.count(card_index)] += 1
+
+    return [
+        CardProbabilities(
+            name=card['name'],
+            card_id=card['id'],
+            count=count,
+            is_basic=is_basic[card_index],
+            prized_distribution=[n / trials for n in prized_counts[card_index]],
+            first_8_distribution=[n / trials for n in first_8_counts[card_index]],
+        ) for card_index, (card, count) in enumerate(grouped_cards)
+    ]
+
+
+def format_percentage(probability):
+    return f"{probability * 100:.5f}%"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Prize and first 8 card probabilities for every card in an exported decklist')
+    parser.add_argument('decklist', help='Path to a decklist exported from the client')
+    parser.add_argument('--card-database', default=CARD_DATABASE_PATH)
+    parser.add_argument('--simulate', action='store_true', help='Use monte carlo simulation instead of exact math')
+    parser.add_argument('--trials', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.decklist) as f:
+        decklist = parse_exported_decklist(f.read(), load_card_database(args.card_database))
+
+    if args.simulate:
+        results = simulate_deck_probabilities(decklist, trials=args.trials, seed=args.seed)
+    else:
+        results = compute_deck_probabilities(decklist)
+
+    for result in results:
+        print(f"{result.count} {result.name} ({'Basic' if result.is_basic else 'non-Basic'})")
+        print("  Prized:      " + ", ".join(f"{k}: {format_percentage(p)}" for k, p in enumerate(result.prized_distribution)))
+        print("  First 8:     " + ", ".join(f"{k}: {format_percentage(p)}" for k, p in enumerate(result.first_8_distribution)))
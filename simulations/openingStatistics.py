@@ -0,0 +1,261 @@
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from math import comb
+
+# Exact (and simulated, for cross checking) opening statistics for a deck:
+# mulligans, the opponent's bonus draws and where the Basic Pokémon end up.
+# Rules modelled:
+# - Each player draws 7 and mulligans (reshuffles and redraws) until the hand has a Basic
+# - Each player draws 1 bonus card for every mulligan their opponent took beyond their own
+# - Prizes are then set from the top 6 cards of the remaining deck
+
+DECK_SIZE = 60
+HAND_SIZE = 7
+PRIZE_SIZE = 6
+
+# Distributions with unbounded support (mulligan counts) are cut off once the
+# remaining tail probability drops below this
+TAIL_TOLERANCE = 1e-12
+
+
+@dataclass
+class OpeningStatistics:
+    basic_count: int
+    opponent_basic_count: int
+    mulligan_probability: float
+    opponent_mulligan_probability: float
+    expected_mulligans: float
+    expected_opponent_mulligans: float
+    # index = number of mulligans / bonus cards drawn
+    mulligan_distribution: list = field(default_factory=list)
+    opponent_mulligan_distribution: list = field(default_factory=list)
+    bonus_draw_distribution: list = field(default_factory=list)
+    opponent_bonus_draw_distribution: list = field(default_factory=list)
+    # (Basics in hand after bonus draws, Basics in prizes) -> probability
+    basics_in_hand_and_prizes: dict = field(default_factory=dict)
+    # Number of simulated trials, or None for exact results
+    trials: int = None
+
+    def basics_in_hand_distribution(self):
+        return marginal_distribution(self.basics_in_hand_and_prizes, 0)
+
+    def prized_basics_distribution(self):
+        return marginal_distribution(self.basics_in_hand_and_prizes, 1)
+
+
+def marginal_distribution(joint_distribution, axis):
+    result = {}
+    for key, probability in joint_distribution.items():
+        result[key[axis]] = result.get(key[axis], 0) + probability
+    return dict(sorted(result.items()))
+
+
+@lru_cache(maxsize=None)
+def hypergeometric_table(population, successes, draws):
+    # Probability of drawing exactly k successes, for every k
+    total = comb(population, draws)
+    return tuple(
+        comb(successes, k) * comb(population - successes, draws - k) / total
+        for k in range(min(successes, draws) + 1)
+    )
+
+
+@lru_cache(maxsize=None)
+def mulligan_probability(basic_count, deck_size=DECK_SIZE):
+    return comb(deck_size - basic_count, HAND_SIZE) / comb(deck_size, HAND_SIZE)
+
+
+@lru_cache(maxsize=None)
+def valid_hand_basic_distribution(basic_count, deck_size=DECK_SIZE):
+    # Number of Basics in the opening hand that is finally kept.
+    # Every redraw is independent, so this doesn't depend on how many mulligans happened
+    valid_hands = comb(deck_size, HAND_SIZE) - comb(deck_size - basic_count, HAND_SIZE)
+    return tuple(
+        0 if basics_in_hand == 0 else
+        comb(basic_count, basics_in_hand) * comb(deck_size - basic_count, HAND_SIZE - basics_in_hand) / valid_hands
+        for basics_in_hand in range(min(basic_count, HAND_SIZE) + 1)
+    )
+
+
+def mulligan_distribution(p):
+    distribution = []
+    tail = 1
+    while tail > TAIL_TOLERANCE:
+        distribution.append(tail * (1 - p))
+        tail *= p
+    return distribution
+
+
+def bonus_draw_distribution(p, q, max_bonus_draws):
+    # p is our mulligan probability, q is the opponent's.
+    # Mulligan counts are independent geometric variables, so for d >= 1:
+    # P(opponent takes exactly d more mulligans) = (1 - p)(1 - q) q^d / (1 - pq)
+    # Anything past max_bonus_draws is capped there since the deck can't supply more
+    distribution = [0] * (max_bonus_draws + 1)
+    scale = (1 - p) * (1 - q) / (1 - p * q)
+    for d in range(1, max_bonus_draws):
+        distribution[d] = scale * q ** d
+    if max_bonus_draws > 0:
+        distribution[max_bonus_draws] = scale * q ** max_bonus_draws / (1 - q)
+    distribution[0] = 1 - sum(distribution[1:])
+    return trim_distribution(distribution)
+
+
+def trim_distribution(distribution):
+    while len(distribution) > 1 and distribution[-1] < TAIL_TOLERANCE:
+        distribution = distribution[:-1]
+    return distribution
+
+
+@lru_cache(maxsize=None)
+def basics_in_hand_and_prizes_given_bonus_draws(basic_count, bonus_draws, deck_size=DECK_SIZE):
+    joint = {}
+    remaining_after_hand = deck_size - HAND_SIZE
+    for basics_in_hand, p_hand in enumerate(valid_hand_basic_distribution(basic_count, deck_size)):
+        if p_hand == 0:
+            continue
+        basics_left = basic_count - basics_in_hand
+        bonus_table = hypergeometric_table(remaining_after_hand, basics_left, bonus_draws)
+        for bonus_basics, p_bonus in enumerate(bonus_table):
+            prize_table = hypergeometric_table(
+                remaining_after_hand - bonus_draws, basics_left - bonus_basics, PRIZE_SIZE
+            )
+            for prized_basics, p_prizes in enumerate(prize_table):
+                key = (basics_in_hand + bonus_basics, prized_basics)
+                joint[key] = joint.get(key, 0) + p_hand * p_bonus * p_prizes
+    return joint
+
+
+def compute_opening_statistics(basic_count, opponent_basic_count=None, deck_size=DECK_SIZE):
+    if opponent_basic_count is None:
+        opponent_basic_count = basic_count  # mirror match
+    assert 1 <= basic_count <= deck_size and 1 <= opponent_basic_count <= deck_size, \
+        "Both decks need at least one Basic"
+
+    p = mulligan_probability(basic_count, deck_size)
+    q = mulligan_probability(opponent_basic_count, deck_size)
+    # Prizes still have to come out of the deck after the bonus draws
+    max_bonus_draws = deck_size - HAND_SIZE - PRIZE_SIZE
+    bonus_draws = bonus_draw_distribution(p, q, max_bonus_draws)
+
+    joint = {}
+    for num_bonus_draws, p_bonus_draws in enumerate(bonus_draws):
+        for key, probability in basics_in_hand_and_prizes_given_bonus_draws(basic_count, num_bonus_draws, deck_size).items():
+            joint[key] = joint.get(key, 0) + p_bonus_draws * probability
+
+    return OpeningStatistics(
+        basic_count=basic_count,
+        opponent_basic_count=opponent_basic_count,
+        mulligan_probability=p,
+        opponent_mulligan_probability=q,
+        expected_mulligans=p / (1 - p),
+        expected_opponent_mulligans=q / (1 - q),
+        mulligan_distribution=mulligan_distribution(p),
+        opponent_mulligan_distribution=mulligan_distribution(q),
+        bonus_draw_distribution=bonus_draws,
+        opponent_bonus_draw_distribution=bonus_draw_distribution(q, p, max_bonus_draws),
+        basics_in_hand_and_prizes=dict(sorted(joint.items())),
+    )
+
+
+def shuffle_until_basic_in_hand(basic_count, rng, deck_size=DECK_SIZE):
+    # Reshuffles until the opening hand has a Basic. Cards are represented by their position in the deck, and
+    # positions below the Basic count are Basics. Returns (mulligans, order of the kept shuffle)
+    mulligans = 0
+    while True:
+        order = rng.sample(range(deck_size), deck_size)
+        if any(card < basic_count for card in order[:HAND_SIZE]):
+            return mulligans, order
+        mulligans += 1
+
+
+def simulate_opening_statistics(
+    basic_count,
+    opponent_basic_count=None,
+    trials=1_000_000,
+    seed=None,
+    batch_size=100_000,
+    deck_size=DECK_SIZE
+):
+    # Monte carlo version of compute_opening_statistics, to sanity check the math
+    if opponent_basic_count is None:
+        opponent_basic_count = basic_count
+    rng = random.Random(seed)
+    max_bonus_draws = deck_size - HAND_SIZE - PRIZE_SIZE
+
+    mulligan_counts = {}
+    opponent_mulligan_counts = {}
+    bonus_draw_counts = {}
+    opponent_bonus_draw_counts = {}
+    joint_counts = {}
+
+    completed_trials = 0
+    while completed_trials < trials:
+        for _ in range(min(batch_size, trials - completed_trials)):
+            mulligans, order = shuffle_until_basic_in_hand(basic_count, rng, deck_size)
+            opponent_mulligans, _ = shuffle_until_basic_in_hand(opponent_basic_count, rng, deck_size)
+            bonus_draws = min(max(0, opponent_mulligans - mulligans), max_bonus_draws)
+            opponent_bonus_draws = min(max(0, mulligans - opponent_mulligans), max_bonus_draws)
+
+            hand = order[:HAND_SIZE + bonus_draws]
+            prizes = order[HAND_SIZE + bonus_draws:HAND_SIZE + bonus_draws + PRIZE_SIZE]
+            key = (
+                sum(card < basic_count for card in hand),
+                sum(card < basic_count for card in prizes),
+            )
+
+            mulligan_counts[mulligans] = mulligan_counts.get(mulligans, 0) + 1
+            opponent_mulligan_counts[opponent_mulligans] = opponent_mulligan_counts.get(opponent_mulligans, 0) + 1
+            bonus_draw_counts[bonus_draws] = bonus_draw_counts.get(bonus_draws, 0) + 1
+            opponent_bonus_draw_counts[opponent_bonus_draws] = opponent_bonus_draw_counts.get(opponent_bonus_draws, 0) + 1
+            joint_counts[key] = joint_counts.get(key, 0) + 1
+        completed_trials += min(batch_size, trials - completed_trials)
+
+    def counts_to_distribution(counts):
+        return [counts.get(i, 0) / trials for i in range(max(counts) + 1)]
+
+    total_mulligans = sum(k * v for k, v in mulligan_counts.items())
+    total_opponent_mulligans = sum(k * v for k, v in opponent_mulligan_counts.items())
+    return OpeningStatistics(
+        basic_count=basic_count,
+        opponent_basic_count=opponent_basic_count,
+        mulligan_probability=total_mulligans / (total_mulligans + trials),
+        opponent_mulligan_probability=total_opponent_mulligans / (total_opponent_mulligans + trials),
+        expected_mulligans=total_mulligans / trials,
+        expected_opponent_mulligans=total_opponent_mulligans / trials,
+        mulligan_distribution=counts_to_distribution(mulligan_counts),
+        opponent_mulligan_distribution=counts_to_distribution(opponent_mulligan_counts),
+        bonus_draw_distribution=counts_to_distribution(bonus_draw_counts),
+        opponent_bonus_draw_distribution=counts_to_distribution(opponent_bonus_draw_counts),
+        basics_in_hand_and_prizes={key: count / trials for key, count in sorted(joint_counts.items())},
+        trials=trials,
+    )
+
+
+def format_percentage(probability):
+    return f"{probability * 100:.5f}%"
+
+
+# We only use this to sanity check some math - not part of main codebase
+if __name__ == "__main__":
+    Y = 11  # total Basics
+    O = 8   # total Basics in the opponent's deck
+    trials = 1_000_000
+
+    exact = compute_opening_statistics(Y, O)
+    simulated = simulate_opening_statistics(Y, O, trials=trials, seed=0)
+
+    print(f"Calculated for {Y} total basics against {O} opponent basics:")
+    print(f"Expected mulligans: {exact.expected_mulligans:.5f} (simulated {simulated.expected_mulligans:.5f})")
+    for bonus_draws, probability in enumerate(exact.bonus_draw_distribution[:5]):
+        simulated_probability = simulated.bonus_draw_distribution[bonus_draws] if bonus_draws < len(simulated.bonus_draw_distribution) else 0
+        print(f"{bonus_draws} bonus draws: {format_percentage(probability)} (simulated {format_percentage(simulated_probability)})")
+    simulated_prized = simulated.prized_basics_distribution()
+    for prized_basics, probability in exact.prized_basics_distribution().items():
+        print(f"{prized_basics} prized basics: {format_percentage(probability)} (simulated {format_percentage(simulated_prized.get(prized_basics, 0))})")
+
+    # Sweeping the Basic count reuses the cached hand composition tables
+    for basic_count in range(1, 21):
+        stats = compute_opening_statistics(basic_count)
+        print(f"{basic_count} basics: {format_percentage(stats.mulligan_probability)} mulligan chance")
@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import hashlib
+import inspect
+import io
+import itertools
+import json
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+
+from basicInFirst8MonteCarloSimulator import monte_carlo_target_basic_in_first_8
+from basicPrizedMonteCarloSimulator import monte_carlo_prized_target_basic
+from forcedBasicMonteCarloSimulator import simulate_forced_target_start
+from nonBasicInFirst8MonteCarloSimulator import monte_carlo_non_basic_in_first_8
+from nonBasicPrizedMonteCarloSimulator import monte_carlo_prized_target_non_basic
+from varianceReduction import METHODS, estimate_scenario
+
+# Runs the simulators over a grid of parameters across processes, caching every
+# cell's result in SQLite so repeated or interrupted sweeps only compute new cells
+
+CACHE_PATH = './sweep_cache.sqlite'
+
+# Scenario name -> (simulator, parameter names in call order, check for whether a cell makes sense)
+SCENARIOS = {
+    'basic_in_first_8': (
+        monte_carlo_target_basic_in_first_8,
+        ['target_basic_copies', 'total_basic_count', 'target_in_first_8'],
+        lambda p: p['target_basic_copies'] <= p['total_basic_count'],
+    ),
+    'basic_prized': (
+        monte_carlo_prized_target_basic,
+        ['target_basic_copies', 'total_basic_count', 'prized_copies'],
+        lambda p: p['target_basic_copies'] <= p['total_basic_count'],
+    ),
+    'forced_basic': (
+        simulate_forced_target_start,
+        ['X', 'Y'],
+        lambda p: 0 <= p['X'] <= p['Y'] <= 60,
+    ),
+    'non_basic_in_first_8': (
+        monte_carlo_non_basic_in_first_8,
+        ['target_non_basic_copies', 'total_basic_count', 'target_in_first_8'],
+        lambda p: p['target_non_basic_copies'] + p['total_basic_count'] <= 60,
+    ),
+    'non_basic_prized': (
+        monte_carlo_prized_target_non_basic,
+        ['target_non_basic_copies', 'total_basic_count', 'prized_copies'],
+        lambda p: p['target_non_basic_copies'] + p['total_basic_count'] <= 60,
+    ),
+}
+
+
+def get_simulator_version(scenario, method=None):
+    # Hash of the source of the code that computes a cell, so cached cells are recomputed when a simulator changes
+    simulator, _, _ = SCENARIOS[scenario]
+    source_files = [inspect.getsourcefile(simulator)]
+    if method is not None:
+        source_files.append(inspect.getsourcefile(estimate_scenario))
+    source_hash = hashlib.sha1()
+    for source_file in source_files:
+        with open(source_file, 'rb') as f:
+            source_hash.update(f.read())
+    return source_hash.hexdigest()
+
+
+def get_scenario_hash(scenario, params, method=None, simulator_version=None):
+    key = {"scenario": scenario, "params": params, "simulator_version": simulator_version}
+    if method is not None:
+        key["method"] = method
+    serialized = json.dumps(key, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+
+def open_cache(path=CACHE_PATH):
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS sweep_results (
+            scenario_hash TEXT NOT NULL,
+            trials INTEGER NOT NULL,
+            seed INTEGER NOT NULL,
+            scenario TEXT NOT NULL,
+            params TEXT NOT NULL,
+            result TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            PRIMARY KEY (scenario_hash, trials, seed)
+        )
+    """)
+    connection.commit()
+    return connection
+
+
+def get_cached_result(connection, scenario_hash, trials, seed):
+    row = connection.execute(
+        "SELECT result FROM sweep_results WHERE scenario_hash = ? AND trials = ? AND seed = ?",
+        (scenario_hash, trials, seed)
+    ).fetchone()
+    return json.loads(row[0]) if row is not None else None
+
+
+def expand_grid(grid):
+    # {'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_cell(scenario, params, trials, seed, method=None):
+    simulator, param_names, _ = SCENARIOS[scenario]
+    if method is not None:
+        # A variance reduced estimator from varianceReduction.py, with its standard error
+        start_time = time.perf_counter()
+        result = asdict(estimate_scenario(scenario, params, trials, method, seed))
+        return result, time.perf_counter() - start_time
+    # The simulators use the global random module, and print their progress as they go
+    random.seed(seed)
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = simulator(*[params[name] for name in param_names], trials)
+    return result, time.perf_counter() - start_time
+
+
+def run_sweep(scenario, grid, trials, seed=0, workers=None, cache_path=CACHE_PATH, method=None):
+    # Returns (params, result) for every valid cell in the grid
+    _, param_names, is_valid_cell = SCENARIOS[scenario]
+    assert set(grid.keys()) == set(param_names), f"Grid for {scenario} must cover exactly {param_names}"
+    if trials < 100:
+        # The simulators print progress every trials // 100 trials, so fewer than 100 would divide by zero
+        raise ValueError(f"run_sweep needs at least 100 trials, got {trials}")
+    simulator_version = get_simulator_version(scenario, method)
+    cells = [params for params in expand_grid(grid) if is_valid_cell(params)]
+
+    connection = open_cache(cache_path)
+    results = {}
+    pending_cells = []
+    for params in cells:
+        scenario_hash = get_scenario_hash(scenario, params, method, simulator_version)
+        cached_result = get_cached_result(connection, scenario_hash, trials, seed)
+        if cached_result is not None:
+            results[scenario_hash] = cached_result
+        else:
+            pending_cells.append((scenario_hash, params))
+    print(f"{len(cells) - len(pending_cells)}/{len(cells)} cells cached, computing {len(pending_cells)}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_cell, scenario, params, trials, seed, method): (scenario_hash, params)
+            for scenario_hash, params in pending_cells
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            scenario_hash, params = futures[future]
+            result, seconds = future.result()
+            # Commit as each cell finishes, so an interrupted sweep can pick up where it left off
+            connection.execute(
+                "INSERT OR REPLACE INTO sweep_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scenario_hash, trials, seed, scenario, json.dumps(params, sort_keys=True), json.dumps(result), seconds)
+            )
+            connection.commit()
+            results[scenario_hash] = result
+            print(f"Progress: {completed}/{len(pending_cells)} cells ({seconds:.1f}s for {params})")
+
+    connection.close()
+    return [(params, results[get_scenario_hash(scenario, params, method, simulator_version)]) for params in cells]
+
+
+def parse_grid_values(value):
+    # '1,2,5-8' -> [1, 2, 5, 6, 7, 8]
+    values = []
+    for part in value.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            values += list(range(int(start), int(end) + 1))
+        else:
+            values.append(int(part))
+    return values
+
+
+def parse_trials(value):
+    # The simulators print progress every trials // 100 trials, so fewer than 100 would divide by zero
+    trials = int(value)
+    if trials < 100:
+        raise argparse.ArgumentTypeError(f"need at least 100 trials, got {trials}")
+    return trials
+
+
+# We only use this to sanity check some math - not part of main codebase
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a simulator over a grid of parameters, caching results')
+    parser.add_argument('scenario', choices=SCENARIOS.keys())
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=VALUES',
+                        help='Parameter values, e.g. total_basic_count=8-14 or prized_copies=0,1,2')
+    parser.add_argument('--trials', type=parse_trials, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=CACHE_PATH)
+    parser.add_argument('--method', choices=METHODS, default=None,
+                        help='Use a variance reduced estimator instead of the simulator (see varianceReduction.py)')
+    args = parser.parse_args()
+
+    grid = {}
+    for grid_arg in args.grid:
+        name, values = grid_arg.split('=')
+        grid[name] = parse_grid_values(values)
+
+    for params, result in run_sweep(args.scenario, grid, args.trials, args.seed, args.workers, args.cache, args.method):
+        print(f"{params}: {result}")
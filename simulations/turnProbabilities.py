@@ -0,0 +1,307 @@
+import argparse
+import json
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from math import comb
+
+from openingStatistics import DECK_SIZE, HAND_SIZE, PRIZE_SIZE, shuffle_until_basic_in_hand
+from varianceReduction import estimate_scenario
+
+# Exact (and simulated, for cross checking) probabilities of having drawn combinations of cards by each turn,
+# e.g. a Stage 2 line by turn 3 in a deck that also plays draw Supporters.
+# Rules modelled, on top of the mulligan and prize rules in openingStatistics.py:
+# - Each turn starts with drawing a card, except the first turn of the player going first
+# - A draw Supporter in hand is played (one per turn, not on the first turn going first) until the goal is met,
+#   drawing supporter_draws cards. Cards already drawn are kept, so "drawn by turn T" means drawn at any point
+# - Prizes can optionally be conditioned on, e.g. "given that one copy of the Stage 2 is prized"
+# The DP is over the counts of each kind of card seen so far. Cards that haven't been seen are exchangeable,
+# so each draw is taken from what's left of the deck and prizes, with unknown prizes hidden among them
+
+DRAW_SUPPORTER = 'Draw Supporter'
+OTHER_BASIC = 'Other Basic'
+OTHER = 'Other'
+
+TURN_TABLES_PATH = './turn_probability_tables.json'
+
+
+@dataclass
+class DrawTarget:
+    name: str
+    copies: int
+    is_basic: bool = False
+    # Copies needed for the goal
+    required: int = 1
+
+
+@dataclass
+class TurnProbabilities:
+    # index = turn - 1
+    goal_probability: list = field(default_factory=list)
+    # Target name -> probability of having drawn its required copies, index = turn - 1
+    target_probabilities: dict = field(default_factory=dict)
+    # Number of simulated trials that matched the prize condition, or None for exact results
+    trials: int = None
+
+
+def get_categories(targets, basic_count, draw_supporters, deck_size):
+    # (names, counts, is_basic) for the targets, draw Supporters and everything else
+    basic_target_copies = sum(target.copies for target in targets if target.is_basic)
+    other_count = deck_size - basic_count - draw_supporters - sum(target.copies for target in targets if not target.is_basic)
+    assert basic_count >= max(basic_target_copies, 1), "Deck needs at least one Basic, including any Basic targets"
+    assert other_count >= 0, "More cards than fit in the deck"
+    names = [target.name for target in targets] + [DRAW_SUPPORTER, OTHER_BASIC, OTHER]
+    counts = [target.copies for target in targets] + [draw_supporters, basic_count - basic_target_copies, other_count]
+    is_basic = [target.is_basic for target in targets] + [False, True, False]
+    return names, tuple(counts), is_basic
+
+
+def iter_compositions(counts, total):
+    # Every way of splitting total cards among categories with at most counts[i] each
+    if len(counts) == 1:
+        if total <= counts[0]:
+            yield (total,)
+        return
+    for first in range(min(counts[0], total) + 1):
+        for rest in iter_compositions(counts[1:], total - first):
+            yield (first,) + rest
+
+
+@lru_cache(maxsize=None)
+def single_draw_distribution(remaining, is_known, hidden):
+    # Probability of the next card drawn being from each category. remaining counts cards in the deck and prizes,
+    # except for categories with known prizes (is_known), whose prizes have already been taken out. hidden
+    # unknown prizes are spread evenly among the other categories' remaining cards
+    known_remaining = sum(count for count, known in zip(remaining, is_known) if known)
+    unknown_remaining = sum(count for count, known in zip(remaining, is_known) if not known)
+    deck_remaining = known_remaining + unknown_remaining - hidden
+    assert deck_remaining > 0, "Drew more cards than are in the deck"
+    return tuple(
+        count / deck_remaining if known else (unknown_remaining - hidden) / deck_remaining * count / unknown_remaining
+        for count, known in zip(remaining, is_known)
+    )
+
+
+def opening_distribution(counts, is_basic, prized, deck_size):
+    # (seen counts after the kept opening hand) -> probability, weighted by the chance of the prize condition
+    is_known = tuple(prized[i] is not None for i in range(len(counts)))
+    known_prizes = sum(prized[i] for i in range(len(counts)) if is_known[i])
+    distribution = {}
+    for hand in iter_compositions(counts, HAND_SIZE):
+        if not any(in_hand > 0 and basic for in_hand, basic in zip(hand, is_basic)):
+            continue  # mulligan
+        probability = 1
+        for count, in_hand in zip(counts, hand):
+            probability *= comb(count, in_hand)
+        # Chance of the prizes (from what's left after the hand) matching the condition
+        remaining = [count - in_hand for count, in_hand in zip(counts, hand)]
+        for i in range(len(counts)):
+            if is_known[i]:
+                probability *= comb(remaining[i], prized[i])
+        probability *= comb(sum(remaining[i] for i in range(len(counts)) if not is_known[i]), PRIZE_SIZE - known_prizes)
+        if probability > 0:
+            distribution[hand] = probability
+    total = sum(distribution.values())
+    assert total > 0, "Prize condition is impossible"
+    return {hand: probability / total for hand, probability in distribution.items()}
+
+
+def compute_turn_probabilities(
+    targets,
+    basic_count,
+    turns=4,
+    going_first=True,
+    draw_supporters=0,
+    supporter_draws=3,
+    prized=None,
+    deck_size=DECK_SIZE
+):
+    # prized: {target name or DRAW_SUPPORTER: copies prized} to condition on
+    names, counts, is_basic = get_categories(targets, basic_count, draw_supporters, deck_size)
+    prized = [None if prized is None else prized.get(name) for name in names]
+    is_known = tuple(copies is not None for copies in prized)
+    prized_known = [copies or 0 for copies in prized]
+    hidden = PRIZE_SIZE - sum(prized_known)
+    assert hidden >= 0, "More than 6 cards prized"
+    supporter_index = names.index(DRAW_SUPPORTER)
+
+    def is_goal_met(seen):
+        return all(seen[i] >= target.required for i, target in enumerate(targets))
+
+    def draw(distribution, draws):
+        # distribution: (seen, supporters played) -> probability
+        for _ in range(draws):
+            next_distribution = {}
+            for (seen, played), probability in distribution.items():
+                remaining = tuple(count - in_hand - prized_count for count, in_hand, prized_count in zip(counts, seen, prized_known))
+                for i, p_category in enumerate(single_draw_distribution(remaining, is_known, hidden)):
+                    if p_category > 0:
+                        key = (seen[:i] + (seen[i] + 1,) + seen[i + 1:], played)
+                        next_distribution[key] = next_distribution.get(key, 0) + probability * p_category
+            distribution = next_distribution
+        return distribution
+
+    distribution = {
+        (hand, 0): probability for hand, probability in opening_distribution(counts, is_basic, prized, deck_size).items()
+    }
+    result = TurnProbabilities(target_probabilities={target.name: [] for target in targets})
+    for turn in range(1, turns + 1):
+        is_first_turn_going_first = going_first and turn == 1
+        if not is_first_turn_going_first:
+            distribution = draw(distribution, 1)
+
+        next_distribution = {}
+        for (seen, played), probability in distribution.items():
+            if is_first_turn_going_first or is_goal_met(seen) or seen[supporter_index] - played == 0 or supporter_draws == 0:
+                next_distribution[(seen, played)] = next_distribution.get((seen, played), 0) + probability
+                continue
+            for key, p_drawn in draw({(seen, played + 1): 1}, supporter_draws).items():
+                next_distribution[key] = next_distribution.get(key, 0) + probability * p_drawn
+        distribution = next_distribution
+
+        result.goal_probability.append(sum(p for (seen, _), p in distribution.items() if is_goal_met(seen)))
+        for i, target in enumerate(targets):
+            result.target_probabilities[target.name].append(
+                sum(p for (seen, _), p in distribution.items() if seen[i] >= target.required)
+            )
+    return result
+
+
+def simulate_turn_probabilities(
+    targets,
+    basic_count,
+    turns=4,
+    going_first=True,
+    draw_supporters=0,
+    supporter_draws=3,
+    prized=None,
+    deck_size=DECK_SIZE,
+    trials=1_000_000,
+    seed=None
+):
+    # Monte carlo version of compute_turn_probabilities. Trials whose prizes don't match the condition are thrown away
+    names, counts, is_basic = get_categories(targets, basic_count, draw_supporters, deck_size)
+    supporter_index = names.index(DRAW_SUPPORTER)
+    # Shuffles come from openingStatistics.py, where positions below the Basic count are Basics, so the
+    # Basic categories are given the lowest positions
+    position_categories = [
+        i for basic_first in [True, False] for i, count in enumerate(counts) if is_basic[i] == basic_first
+        for _ in range(count)
+    ]
+    rng = random.Random(seed)
+
+    goal_counts = [0] * turns
+    target_counts = [[0] * turns for _ in targets]
+    accepted_trials = 0
+    for _ in range(trials):
+        _, order = shuffle_until_basic_in_hand(basic_count, rng, deck_size)
+        deck = [position_categories[position] for position in order]
+        prizes = deck[HAND_SIZE:HAND_SIZE + PRIZE_SIZE]
+        if prized is not None and any(prizes.count(names.index(name)) != copies for name, copies in prized.items()):
+            continue
+        accepted_trials += 1
+
+        seen = [0] * len(counts)
+        for i in deck[:HAND_SIZE]:
+            seen[i] += 1
+        next_card = HAND_SIZE + PRIZE_SIZE
+        played = 0
+
+        def is_goal_met():
+            return all(seen[i] >= target.required for i, target in enumerate(targets))
+
+        for turn in range(1, turns + 1):
+            is_first_turn_going_first = going_first and turn == 1
+            draws = 0 if is_first_turn_going_first else 1
+            for i in deck[next_card:next_card + draws]:
+                seen[i] += 1
+            next_card += draws
+            if not is_first_turn_going_first and not is_goal_met() and seen[supporter_index] - played > 0 and supporter_draws > 0:
+                played += 1
+                for i in deck[next_card:next_card + supporter_draws]:
+                    seen[i] += 1
+                next_card += supporter_draws
+
+            goal_counts[turn - 1] += is_goal_met()
+            for i, target in enumerate(targets):
+                target_counts[i][turn - 1] += seen[i] >= target.required
+
+    assert accepted_trials > 0, "No trials matched the prize condition"
+    return TurnProbabilities(
+        goal_probability=[count / accepted_trials for count in goal_counts],
+        target_probabilities={
+            target.name: [count / accepted_trials for count in target_counts[i]] for i, target in enumerate(targets)
+        },
+        trials=accepted_trials,
+    )
+
+
+def build_turn_tables(turns=6, max_basic_count=20, max_copies=4):
+    # Probability of having drawn at least one copy of a card by each turn, to look up without running the DP:
+    # {"going_first" / "going_second": {"basic" / "non_basic": {basic count: {copies: [by turn]}}}}
+    tables = {}
+    for going_first in [True, False]:
+        turn_order_tables = tables.setdefault("going_first" if going_first else "going_second", {})
+        for is_basic in [True, False]:
+            basic_tables = turn_order_tables.setdefault("basic" if is_basic else "non_basic", {})
+            for basic_count in range(1, max_basic_count + 1):
+                for copies in range(1, max_copies + 1):
+                    if is_basic and copies > basic_count:
+                        continue
+                    probabilities = compute_turn_probabilities(
+                        [DrawTarget('Target', copies, is_basic)], basic_count, turns=turns, going_first=going_first
+                    )
+                    basic_tables.setdefault(str(basic_count), {})[str(copies)] = probabilities.goal_probability
+    return {"turns": turns, "tables": tables}
+
+
+def format_percentage(probability):
+    return f"{probability * 100:.5f}%"
+
+
+# We only use this to sanity check some math - not part of main codebase
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Exact turn by turn draw probabilities, cross checked by simulation')
+    parser.add_argument('--trials', type=int, default=200_000)
+    parser.add_argument('--export', default=None, metavar='PATH', nargs='?', const=TURN_TABLES_PATH,
+                        help='Write precomputed tables instead')
+    args = parser.parse_args()
+
+    if args.export is not None:
+        with open(args.export, 'w') as f:
+            json.dump(build_turn_tables(), f)
+        print(f"Wrote turn probability tables to {args.export}")
+    else:
+        # Stage 2 line (Basic, Stage 2 and Rare Candy) by turn 3, with 4 draw Supporters drawing 3 each
+        targets = [
+            DrawTarget('Basic', 4, is_basic=True),
+            DrawTarget('Stage 2', 3),
+            DrawTarget('Rare Candy', 4),
+        ]
+        for prized in [None, {'Stage 2': 1}]:
+            kwargs = dict(basic_count=12, turns=4, going_first=False, draw_supporters=4, supporter_draws=3, prized=prized)
+            exact = compute_turn_probabilities(targets, **kwargs)
+            simulated = simulate_turn_probabilities(targets, trials=args.trials, seed=0, **kwargs)
+            print(f"Stage 2 line, prizes conditioned on {prized} ({simulated.trials} matching trials):")
+            for turn in range(kwargs['turns']):
+                print(
+                    f"  By turn {turn + 1}: {format_percentage(exact.goal_probability[turn])} "
+                    f"(simulated {format_percentage(simulated.goal_probability[turn])})"
+                )
+
+        # At least one copy of a Basic in the first 8 cards is turn 1 going second, which parameterSweep.py's
+        # basic_in_first_8 scenario also covers, as the complement of having none
+        copies, basic_count = 4, 12
+        exact = compute_turn_probabilities([DrawTarget('Target', copies, is_basic=True)], basic_count, turns=1, going_first=False)
+        none_in_first_8 = estimate_scenario(
+            'basic_in_first_8',
+            {'target_basic_copies': copies, 'total_basic_count': basic_count, 'target_in_first_8': 0},
+            args.trials,
+            seed=0,
+        )
+        print(
+            f"{copies} copies of a Basic in the first 8 cards, with {basic_count} Basics: "
+            f"{format_percentage(exact.goal_probability[0])} "
+            f"(basic_in_first_8 estimate {format_percentage(1 - none_in_first_8.estimate)} "
+            f"± {format_percentage(none_in_first_8.standard_error)})"
+        )
@@ -0,0 +1,296 @@
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from math import comb, exp, sqrt
+
+from deckProbabilities import first_8_distribution, prized_distribution
+from openingStatistics import (
+    DECK_SIZE,
+    HAND_SIZE,
+    PRIZE_SIZE,
+    hypergeometric_table,
+    mulligan_probability,
+    valid_hand_basic_distribution,
+)
+
+# Lower variance Monte Carlo estimators for the scenarios in parameterSweep.py, for cross checking the exact math
+# with far fewer trials. Every estimator samples the opening hand as (target copies in hand, other Basics in hand):
+# - plain: the same experiment as the simulators - mulligan until there's a Basic, then look at the next cards
+# - conditional: only the hand is sampled, and the step after it (the 8th card or the prizes) is replaced by the
+#   exact hypergeometric probability of the event given that hand
+# - stratified: hands are sampled separately for each number of Basics in the kept hand, and the strata are
+#   weighted by their exact probabilities, so none of the variance comes from how many Basics were drawn
+# - importance: the number of target copies in hand is sampled from an exponentially tilted distribution and
+#   reweighted, which puts more samples on the hands that make a rare event possible
+# Each estimate reports its variance reduction factor - how many plain trials it takes to match one of its trials
+
+METHODS = ['plain', 'conditional', 'stratified', 'importance']
+
+# Scenario name -> parameter names, in the same order as parameterSweep.py's SCENARIOS
+SCENARIO_PARAMS = {
+    'basic_in_first_8': ['target_basic_copies', 'total_basic_count', 'target_in_first_8'],
+    'basic_prized': ['target_basic_copies', 'total_basic_count', 'prized_copies'],
+    'forced_basic': ['X', 'Y'],
+    'non_basic_in_first_8': ['target_non_basic_copies', 'total_basic_count', 'target_in_first_8'],
+    'non_basic_prized': ['target_non_basic_copies', 'total_basic_count', 'prized_copies'],
+}
+
+# Share of the importance sampling trials spent on a pilot run that picks the tilt
+IMPORTANCE_PILOT_FRACTION = 0.1
+
+
+@dataclass
+class VarianceReducedEstimate:
+    scenario: str
+    method: str
+    estimate: float
+    standard_error: float
+    trials: int
+    # Plain Monte Carlo variance per trial divided by this estimator's, counting any pilot trials
+    variance_reduction_factor: float
+
+
+@dataclass
+class ScenarioSetup:
+    target_copies: int
+    target_is_basic: bool
+    basic_count: int
+    # 'first_8', 'prized' or 'forced'
+    event: str
+    # Copies in the first 8 cards or prizes that count as a success
+    event_copies: int = 0
+
+    @property
+    def other_basic_count(self):
+        return self.basic_count - self.target_copies if self.target_is_basic else self.basic_count
+
+
+def get_scenario_setup(scenario, params):
+    values = [params[name] for name in SCENARIO_PARAMS[scenario]]
+    if scenario == 'forced_basic':
+        return ScenarioSetup(values[0], True, values[1], 'forced')
+    target_is_basic = scenario.startswith('basic')
+    event = 'first_8' if scenario.endswith('first_8') else 'prized'
+    return ScenarioSetup(values[0], target_is_basic, values[1], event, values[2])
+
+
+def get_exact_probability(setup):
+    if setup.event == 'forced':
+        non_basic_count = DECK_SIZE - setup.basic_count
+        valid_hands = comb(DECK_SIZE, HAND_SIZE) - comb(non_basic_count, HAND_SIZE)
+        # Hands with no other Basic, minus the ones with no Basic at all
+        return (comb(non_basic_count + setup.target_copies, HAND_SIZE) - comb(non_basic_count, HAND_SIZE)) / valid_hands
+    distribution_function = first_8_distribution if setup.event == 'first_8' else prized_distribution
+    distribution = distribution_function(setup.target_copies, setup.target_is_basic, setup.basic_count)
+    return distribution[setup.event_copies] if setup.event_copies < len(distribution) else 0
+
+
+def is_valid_hand(setup, in_hand, other_basics_in_hand):
+    return other_basics_in_hand > 0 or (setup.target_is_basic and in_hand > 0)
+
+
+def sample_hand(setup, rng):
+    # (target copies, other Basics) in a single 7 card draw, which may need a mulligan
+    in_hand = other_basics_in_hand = 0
+    for position in rng.sample(range(DECK_SIZE), HAND_SIZE):
+        if position < setup.target_copies:
+            in_hand += 1
+        elif position < setup.target_copies + setup.other_basic_count:
+            other_basics_in_hand += 1
+    return in_hand, other_basics_in_hand
+
+
+def sample_valid_hand(setup, rng):
+    while True:
+        in_hand, other_basics_in_hand = sample_hand(setup, rng)
+        if is_valid_hand(setup, in_hand, other_basics_in_hand):
+            return in_hand, other_basics_in_hand
+
+
+def sample_event(setup, in_hand, other_basics_in_hand, rng):
+    # Whether the event happens after the given hand, by drawing the cards after it
+    if setup.event == 'forced':
+        return float(other_basics_in_hand == 0)
+    remaining_targets = setup.target_copies - in_hand
+    positions = rng.sample(range(DECK_SIZE - HAND_SIZE), PRIZE_SIZE)
+    if setup.event == 'first_8':
+        return float(in_hand + (positions[0] < remaining_targets) == setup.event_copies)
+    return float(sum(position < remaining_targets for position in positions) == setup.event_copies)
+
+
+def event_probability_given_hand(setup, in_hand, other_basics_in_hand):
+    # The exact expectation of sample_event, so the only randomness left is in the hand
+    if setup.event == 'forced':
+        return float(other_basics_in_hand == 0)
+    remaining_targets = setup.target_copies - in_hand
+    if setup.event == 'first_8':
+        p_hit = remaining_targets / (DECK_SIZE - HAND_SIZE)
+        return (in_hand == setup.event_copies) * (1 - p_hit) + (in_hand + 1 == setup.event_copies) * p_hit
+    prize_table = hypergeometric_table(DECK_SIZE - HAND_SIZE, remaining_targets, PRIZE_SIZE)
+    return prize_table[setup.event_copies] if setup.event_copies < len(prize_table) else 0
+
+
+def get_hand_value(setup, in_hand, other_basics_in_hand, conditional, rng):
+    if conditional:
+        return event_probability_given_hand(setup, in_hand, other_basics_in_hand)
+    return sample_event(setup, in_hand, other_basics_in_hand, rng)
+
+
+def mean_and_variance(values):
+    mean = sum(values) / len(values)
+    variance = sum((value - mean) ** 2 for value in values) / max(len(values) - 1, 1)
+    return mean, variance
+
+
+def estimate_plain(setup, trials, rng, conditional=False):
+    # Returns (estimate, variance of the estimate)
+    values = [get_hand_value(setup, *sample_valid_hand(setup, rng), conditional, rng) for _ in range(trials)]
+    mean, variance = mean_and_variance(values)
+    return mean, variance / trials
+
+
+def sample_hand_in_stratum(setup, basics_in_hand, rng):
+    # A kept hand with exactly this many Basics, every such hand equally likely
+    if setup.target_is_basic:
+        in_hand = sum(position < setup.target_copies for position in rng.sample(range(setup.basic_count), basics_in_hand))
+        return in_hand, basics_in_hand - in_hand
+    non_basic_count = DECK_SIZE - setup.basic_count
+    in_hand = sum(
+        position < setup.target_copies for position in rng.sample(range(non_basic_count), HAND_SIZE - basics_in_hand)
+    )
+    return in_hand, basics_in_hand
+
+
+def estimate_stratified(setup, trials, rng, conditional=True):
+    # Proportional allocation, with at least 2 trials per stratum so each one has a variance estimate
+    estimate = estimate_variance = 0
+    for basics_in_hand, weight in enumerate(valid_hand_basic_distribution(setup.basic_count)):
+        if weight == 0:
+            continue
+        stratum_trials = max(round(trials * weight), 2)
+        values = [
+            get_hand_value(setup, *sample_hand_in_stratum(setup, basics_in_hand, rng), conditional, rng)
+            for _ in range(stratum_trials)
+        ]
+        mean, variance = mean_and_variance(values)
+        estimate += weight * mean
+        estimate_variance += weight ** 2 * variance / stratum_trials
+    return estimate, estimate_variance
+
+
+def get_tilted_distribution(distribution, target_mean):
+    # q(k) proportional to p(k) * exp(theta * k), with theta found by bisection so q has the target mean
+    support = [k for k, p in enumerate(distribution) if p > 0]
+    target_mean = min(max(target_mean, support[0] + 0.01), support[-1] - 0.01) if len(support) > 1 else support[0]
+
+    def tilt(theta):
+        weights = [p * exp(theta * k) for k, p in enumerate(distribution)]
+        total = sum(weights)
+        return [weight / total for weight in weights]
+
+    low, high = -20, 20
+    for _ in range(100):
+        theta = (low + high) / 2
+        if sum(k * q for k, q in enumerate(tilt(theta))) < target_mean:
+            low = theta
+        else:
+            high = theta
+    return tilt((low + high) / 2)
+
+
+def estimate_importance(setup, trials, rng, conditional=True):
+    # The target copies in a single 7 card draw follow p, and are sampled from the tilted q instead, weighting each
+    # hand by p / q. Mulligans are accounted for by dividing by the exact probability of a valid hand.
+    # The tilt matches q's mean to the mean copies in hand given the event, estimated by a pilot run of
+    # conditional samples - the mean of the zero variance sampling distribution (a cross entropy step)
+    pilot_trials = max(int(trials * IMPORTANCE_PILOT_FRACTION), 1)
+    pilot_hands = [sample_valid_hand(setup, rng) for _ in range(pilot_trials)]
+    pilot_values = [event_probability_given_hand(setup, *hand) for hand in pilot_hands]
+    p = hypergeometric_table(DECK_SIZE, setup.target_copies, HAND_SIZE)
+    if sum(pilot_values) > 0:
+        target_mean = sum(value * hand[0] for value, hand in zip(pilot_values, pilot_hands)) / sum(pilot_values)
+        q = get_tilted_distribution(p, target_mean)
+    else:
+        q = p
+
+    valid_probability = 1 - mulligan_probability(setup.basic_count)
+    non_target_count = DECK_SIZE - setup.target_copies
+    values = []
+    for in_hand in rng.choices(range(len(q)), weights=q, k=trials - pilot_trials):
+        other_basics_in_hand = sum(
+            position < setup.other_basic_count for position in rng.sample(range(non_target_count), HAND_SIZE - in_hand)
+        )
+        if not is_valid_hand(setup, in_hand, other_basics_in_hand):
+            values.append(0)
+            continue
+        weight = p[in_hand] / q[in_hand]
+        values.append(weight * get_hand_value(setup, in_hand, other_basics_in_hand, conditional, rng) / valid_probability)
+    mean, variance = mean_and_variance(values)
+    return mean, variance / len(values)
+
+
+def estimate_scenario(scenario, params, trials, method='conditional', seed=None, conditional=True):
+    # conditional only changes the stratified and importance estimators - plain is always the raw experiment,
+    # and 'conditional' is plain sampling with the conditional estimator
+    setup = get_scenario_setup(scenario, params)
+    rng = random.Random(seed)
+    if method == 'plain':
+        estimate, estimate_variance = estimate_plain(setup, trials, rng)
+    elif method == 'conditional':
+        estimate, estimate_variance = estimate_plain(setup, trials, rng, conditional=True)
+    elif method == 'stratified':
+        estimate, estimate_variance = estimate_stratified(setup, trials, rng, conditional)
+    elif method == 'importance':
+        estimate, estimate_variance = estimate_importance(setup, trials, rng, conditional)
+    else:
+        raise ValueError(f"Unknown method {method}, expected one of {METHODS}")
+
+    # A single plain trial is a Bernoulli draw with the estimated probability
+    clamped_estimate = min(max(estimate, 0), 1)
+    plain_variance = clamped_estimate * (1 - clamped_estimate)
+    trial_variance = estimate_variance * trials
+    return VarianceReducedEstimate(
+        scenario=scenario,
+        method=method,
+        estimate=estimate,
+        standard_error=sqrt(estimate_variance),
+        trials=trials,
+        variance_reduction_factor=plain_variance / trial_variance if trial_variance > 0 else float('inf'),
+    )
+
+
+def format_percentage(probability):
+    return f"{probability * 100:.5f}%"
+
+
+# We only use this to sanity check some math - not part of main codebase
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare variance reduced estimators against the exact probability')
+    parser.add_argument('scenario', choices=SCENARIO_PARAMS.keys())
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='Scenario parameter, e.g. total_basic_count=11')
+    parser.add_argument('--trials', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--method', action='append', choices=METHODS, default=None)
+    parser.add_argument('--no-conditional', action='store_true',
+                        help='Use the sampled event instead of its conditional probability when stratifying or importance sampling')
+    args = parser.parse_args()
+
+    params = {name: int(value) for name, value in (param.split('=') for param in args.param)}
+    assert set(params.keys()) == set(SCENARIO_PARAMS[args.scenario]), \
+        f"{args.scenario} needs exactly {SCENARIO_PARAMS[args.scenario]}"
+
+    exact_probability = get_exact_probability(get_scenario_setup(args.scenario, params))
+    print(f"Exact probability: {format_percentage(exact_probability)}")
+    for method in args.method or METHODS:
+        start_time = time.perf_counter()
+        result = estimate_scenario(args.scenario, params, args.trials, method, args.seed, not args.no_conditional)
+        seconds = time.perf_counter() - start_time
+        error_in_standard_errors = abs(result.estimate - exact_probability) / result.standard_error \
+            if result.standard_error > 0 else 0
+        print(
+            f"{method}: {format_percentage(result.estimate)} ± {format_percentage(result.standard_error)} "
+            f"({error_in_standard_errors:.1f} standard errors from exact), "
+            f"variance reduction factor {result.variance_reduction_factor:.1f}, {seconds:.1f}s"
+        )